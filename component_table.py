@@ -0,0 +1,138 @@
+from PyQt5.QtCore import (
+    Qt,
+    QAbstractTableModel,
+    QModelIndex,
+    QTimer,
+    pyqtSignal,
+)
+from PyQt5.QtWidgets import (
+    QStyledItemDelegate,
+    QComboBox,
+    QTableView,
+    QAbstractItemView,
+    QHeaderView,
+)
+
+CONDITIONS = ["Good", "Damaged", "Missing"]
+PART_COLUMN = 0
+CONDITION_COLUMN = 1
+
+
+class ComponentTableModel(QAbstractTableModel):
+    """
+    Table of the components of the current SKU and their conditions.
+    Handles any number of components. When the same components are shown again
+    only the conditions that changed are repainted.
+    """
+
+    conditionChanged = pyqtSignal(str, str)  # Emitted for user edits only
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.parts = []
+        self.rows = {}  # part -> row
+        self.conditions = {}  # part -> condition
+
+    def set_components(self, components):
+        conditions = {
+            part: condition if condition in CONDITIONS else CONDITIONS[0]
+            for part, condition in components.items()
+        }
+
+        if list(conditions) != self.parts:
+            self.beginResetModel()
+            self.parts = list(conditions)
+            self.rows = {part: row for row, part in enumerate(self.parts)}
+            self.conditions = conditions
+            self.endResetModel()
+            return
+
+        for part, condition in conditions.items():
+            if self.conditions[part] != condition:
+                self.conditions[part] = condition
+                index = self.index(self.rows[part], CONDITION_COLUMN)
+                self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+
+    def clear(self):
+        self.set_components({})
+
+    def components(self):
+        return dict(self.conditions)
+
+    def condition(self, part):
+        return self.conditions.get(part)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.parts)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 2
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        part = self.parts[index.row()]
+        if index.column() == PART_COLUMN:
+            return part
+        return self.conditions[part]
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or index.column() != CONDITION_COLUMN:
+            return False
+        part = self.parts[index.row()]
+        if self.conditions[part] != value:
+            self.conditions[part] = value
+            self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+            self.conditionChanged.emit(part, value)
+        return True
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.column() == CONDITION_COLUMN:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return ["Component", "Condition"][section]
+        return None
+
+
+class ConditionDelegate(QStyledItemDelegate):
+    """Edits a condition with a dropdown that commits as soon as it is picked."""
+
+    def createEditor(self, parent, option, index):
+        editor = QComboBox(parent)
+        editor.addItems(CONDITIONS)
+        editor.activated.connect(lambda: self.commit_and_close(editor))
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setCurrentText(index.data(Qt.EditRole))
+        # Open the list right away so a condition is picked with a single click
+        QTimer.singleShot(0, editor.showPopup)
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.currentText(), Qt.EditRole)
+
+    def commit_and_close(self, editor):
+        self.commitData.emit(editor)
+        self.closeEditor.emit(editor)
+
+
+class ComponentTableView(QTableView):
+    """Scrollable component editor, editors are only created for the clicked cell."""
+
+    def __init__(self, row_height=50, parent=None):
+        super().__init__(parent)
+        self.setItemDelegateForColumn(CONDITION_COLUMN, ConditionDelegate(self))
+        self.setEditTriggers(QAbstractItemView.AllEditTriggers)
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setShowGrid(False)
+        self.setWordWrap(False)
+
+        self.verticalHeader().setVisible(False)
+        self.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.verticalHeader().setDefaultSectionSize(row_height)
+        self.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
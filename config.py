@@ -7,22 +7,89 @@ db_config = {
         "driver": "{ODBC Driver 17 for SQL Server}",
         "port": 1433,  # Default port for SQL Server
     },
+    "ExampleDbReplica": {
+        "server": "example.database.windows.net",
+        "database": "ExampleDb",
+        "username": "example",
+        "password": "example",
+        "driver": "{ODBC Driver 17 for SQL Server}",
+        "port": 1433,
+        "application_intent": "ReadOnly",  # Routed to a readable secondary
+    },
 }
 
 
 def create_connection_string(server_config):
-    return (
+    connection_string = (
         f"DRIVER={server_config['driver']};"
         f"SERVER={server_config['server']};"
-        f"PORT={server_config["port"]};DATABASE={server_config['database']};"
+        f"PORT={server_config['port']};DATABASE={server_config['database']};"
         f"UID={server_config['username']};"
         f"PWD={server_config['password']}"
     )
+    if server_config.get("application_intent"):
+        connection_string += f";ApplicationIntent={server_config['application_intent']}"
+    return connection_string
 
 
+SMTP_SERVER = {
+    "host": "smtp.gmail.com",
+    "port": 465,
+    "use_ssl": True,  # Set to False (and login to False) for a local SMTP stand-in
+    "login": True,
+    "timeout": 10,
+}
+
 SENDER_EMAIL = "sender_email@domain.com"
 SENDER_PASSWORD = "sender_password"
 RECIPIENT_EMAILS = [
     "recipient_email_1@domain.com",
     "recipient_email_2@domain.com",
 ]  # List of emails to send the report
+
+LABEL_PRINTER = {
+    "enabled": False,  # Print a bin label for every SKU and component on check in
+    "host": "192.168.1.100",  # Zebra printer receiving raw ZPL
+    "port": 9100,
+    "timeout": 5,
+    "file": None,  # Write the ZPL to this file instead of the printer (testing)
+}
+
+RESULT_CACHE = {
+    "size": 256,  # Most tracking numbers kept in memory after a search
+    "ttl": 300,  # Seconds before a cached search is fetched again
+}
+
+EXPECTED_ARRIVALS = {
+    "max_tracking_numbers": 5000,  # Newest open returns preloaded, older are searched
+}
+
+SNAPSHOT = {
+    "path": None,  # Station cache snapshot file, None for one in the home folder
+    "interval": 300,  # Seconds between snapshot saves, it is also saved on exit
+    "max_age": 43200,  # Seconds the saved open returns are trusted before a preload
+}
+
+DB_RESILIENCE = {
+    "attempts": 3,  # Tries of a read that fails with a transient error
+    "base_delay": 0.2,  # Seconds before the first retry, doubled on every retry
+    "max_delay": 3,  # Longest wait between retries
+    "failure_threshold": 5,  # Transient failures in a row that stop database calls
+    "reset_timeout": 30,  # Seconds before trying the database again after that
+}
+
+DB_TIMEOUTS = {
+    "login": 10,  # Seconds to open a connection
+    "query": 15,  # Seconds a statement may run before it is aborted
+    "preload": 120,  # Seconds for the statements of the expected arrivals preload
+}
+
+DB_ROUTING = {
+    "replica": None,  # db_config entry reads are sent to, None to read from the primary
+    "read_your_writes": 30,  # Seconds a checked in return is read from the primary
+}
+
+PALLET_POLLING = {
+    "interval": 5,  # Seconds between checks for other stations' changes, 0 disables
+    "reconcile": 60,  # Seconds between recounts of the received SKUs of the pallet
+}
@@ -0,0 +1,37 @@
+from PyQt5.QtCore import QObject, QTimer
+
+
+class EditBuffer(QObject):
+    """
+    Coalesces UI edits before they are written into the return model.
+    Edited fields are only marked as pending, and are applied together once the
+    user pauses for the debounce interval, or right away when flush is called.
+    """
+
+    def __init__(self, apply, interval=300, parent=None):
+        super().__init__(parent)
+        self.apply = apply  # Called with the set of pending keys
+        self.pending = set()
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.flush)
+
+    def mark(self, key):
+        """Mark a field as edited and restart the debounce interval."""
+        self.pending.add(key)
+        self.timer.start()
+
+    def flush(self):
+        """Apply the pending edits now."""
+        self.timer.stop()
+        if self.pending:
+            pending = self.pending
+            self.pending = set()
+            self.apply(pending)
+
+    def discard(self):
+        """Drop the pending edits without applying them."""
+        self.timer.stop()
+        self.pending.clear()
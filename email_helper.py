@@ -1,12 +1,17 @@
 import smtplib
 from email.message import EmailMessage
-from config import SENDER_EMAIL, SENDER_PASSWORD, RECIPIENT_EMAILS
+from config import SENDER_EMAIL, SENDER_PASSWORD, RECIPIENT_EMAILS, SMTP_SERVER
 import os
 import getpass
 import socket
+import threading
+import hashlib
+import atexit
+import time
 
 
-def send_email(subject, body):
+def build_message(subject, body):
+    """Build the email with the folder, computer and user it was sent from."""
     current_dir = os.getcwd()
     folder_name = os.path.basename(current_dir)
     computer_name = socket.gethostname()
@@ -20,11 +25,207 @@ def send_email(subject, body):
     msg["Subject"] = f"{subject} : {folder_name}"
     msg["From"] = SENDER_EMAIL
     msg["To"] = ", ".join(RECIPIENT_EMAILS)
+    return msg
+
+
+def connect_smtp(smtp_config=SMTP_SERVER):
+    """Open and log in an SMTP session described by the configuration."""
+    if smtp_config.get("use_ssl", True):
+        server = smtplib.SMTP_SSL(
+            smtp_config["host"], smtp_config["port"], timeout=smtp_config["timeout"]
+        )
+    else:
+        server = smtplib.SMTP(
+            smtp_config["host"], smtp_config["port"], timeout=smtp_config["timeout"]
+        )
+    if smtp_config.get("login", True):
+        server.login(SENDER_EMAIL, SENDER_PASSWORD)
+    return server
+
+
+def send_email(subject, body):
+    msg = build_message(subject, body)
 
     try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(SENDER_EMAIL, SENDER_PASSWORD)
+        with connect_smtp() as server:
             server.send_message(msg)
         print("Email sent successfully.")
     except Exception as e:
         print(f"Error sending email: {e}")
+
+
+class ErrorOutbox:
+    """
+    Collects error reports and sends them from a background thread as rate limited
+    digests. Identical reports are merged, and a report that was already emailed
+    recently is only counted instead of being sent in full again. The SMTP session
+    is kept open and reused between digests.
+    """
+
+    def __init__(self, smtp_config=SMTP_SERVER, min_interval=60, dedupe_window=3600):
+        self.smtp_config = smtp_config
+        self.min_interval = min_interval  # Seconds between two digests
+        self.dedupe_window = dedupe_window  # Seconds a sent report stays known
+        self.pending = {}  # key -> [subject, body, count]
+        self.recently_sent = {}  # key -> time the full report was last sent
+        self.last_sent = None
+        self.server = None
+        self.running = False
+        self.thread = None
+        self.condition = threading.Condition()
+
+    def start(self):
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self.run, name="ErrorOutbox", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=10):
+        """Send whatever is still pending and close the SMTP session."""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread:
+            self.thread.join(timeout)
+
+    def report(self, subject, body):
+        """Queue an error report. Never blocks on the network."""
+        key = hashlib.sha1(f"{subject}\n{body}".encode("utf-8")).hexdigest()
+        with self.condition:
+            if key in self.pending:
+                self.pending[key][2] += 1
+            else:
+                self.pending[key] = [subject, body, 1]
+            self.condition.notify()
+
+    def seconds_until_next_send(self):
+        if not self.pending:
+            return None  # Nothing to send, wait for a report
+        if self.last_sent is None:
+            return 0
+        return max(0, self.last_sent + self.min_interval - time.monotonic())
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running:
+                    wait_time = self.seconds_until_next_send()
+                    if wait_time == 0:
+                        break
+                    self.condition.wait(wait_time)
+
+                # When stopping, flush the pending reports without rate limiting
+                if not self.pending:
+                    break
+                batch = self.pending
+                self.pending = {}
+                self.last_sent = time.monotonic()
+
+            if not self.send_digest(batch):
+                with self.condition:
+                    if not self.running:
+                        break  # Stopping, the reports are lost
+                    # Sent again with the next digest, once the interval is over
+                    self.requeue(batch)
+
+        self.disconnect()
+
+    def requeue(self, batch):
+        """Put back the reports of a digest that could not be sent."""
+        for key, (subject, body, count) in batch.items():
+            if key in self.pending:
+                self.pending[key][2] += count
+            else:
+                self.pending[key] = [subject, body, count]
+
+    def build_digest(self, batch):
+        """
+        Build the email of a batch of reports.
+        :return: The email and the keys of the reports sent in full.
+        """
+        now = time.monotonic()
+        self.recently_sent = {
+            key: sent_at
+            for key, sent_at in self.recently_sent.items()
+            if now - sent_at < self.dedupe_window
+        }
+
+        sections = []
+        sent_in_full = []
+        total = 0
+        for key, (subject, body, count) in batch.items():
+            total += count
+            repeated = f" (x{count})" if count > 1 else ""
+            if key in self.recently_sent:
+                sections.append(f"{subject}{repeated}: same error as already reported.")
+            else:
+                sections.append(f"{subject}{repeated}:\n{body}")
+                sent_in_full.append(key)
+
+        if len(batch) == 1:
+            subject = batch[next(iter(batch))][0]
+        else:
+            subject = f"Error digest ({total} errors)"
+        return build_message(subject, "\n\n".join(sections)), sent_in_full
+
+    def send_digest(self, batch):
+        """Email a batch of reports. Returns False if it could not be sent."""
+        msg, sent_in_full = self.build_digest(batch)
+        try:
+            try:
+                self.get_server().send_message(msg)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                # The kept alive session was dropped by the server, retry once
+                self.disconnect()
+                self.get_server().send_message(msg)
+            print("Email sent successfully.")
+        except Exception as e:
+            self.disconnect()
+            print(f"Error sending email: {e}")
+            return False
+        now = time.monotonic()
+        for key in sent_in_full:
+            self.recently_sent[key] = now
+        return True
+
+    def get_server(self):
+        """Return the open SMTP session, logging in again only if it was dropped."""
+        if self.server is not None:
+            try:
+                if self.server.noop()[0] == 250:
+                    return self.server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.disconnect()
+        self.server = connect_smtp(self.smtp_config)
+        return self.server
+
+    def disconnect(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.server = None
+
+
+error_outbox = None
+error_outbox_lock = threading.Lock()
+
+
+def get_error_outbox():
+    """Return the shared error outbox, starting it on first use."""
+    global error_outbox
+    with error_outbox_lock:
+        if error_outbox is None:
+            error_outbox = ErrorOutbox()
+            error_outbox.start()
+            atexit.register(error_outbox.stop)
+    return error_outbox
+
+
+def report_error(subject, body):
+    """Queue an error report to be emailed in the background."""
+    get_error_outbox().report(subject, body)
@@ -1,83 +1,361 @@
 import pyodbc
-from config import create_connection_string, db_config
+from config import (
+    create_connection_string,
+    db_config,
+    RESULT_CACHE,
+    DB_RESILIENCE,
+    DB_TIMEOUTS,
+    DB_ROUTING,
+    EXPECTED_ARRIVALS,
+)
+from return_line import ReturnLine
+import statements
+from return_cache import ExpectedArrivalsCache, ResultCache, copy_lines
+from resilience import (
+    CircuitBreaker,
+    DatabaseUnavailable,
+    QueryCancelled,
+    is_transient,
+    resilient,
+)
+from collections import Counter
 from datetime import datetime
 import socket
+import threading
+import time
+
+PRIMARY = "primary"
+REPLICA = "replica"
+
+
+class WriteConflict(Exception):
+    """The row was changed by another station since it was read, nothing was written."""
 
 
 class ExampleDb:
-    def __init__(self):
-        self.conn = None
-        self.cursor = None
-        self.connect()
+    def __init__(self, arrivals=None, query_timeout=DB_TIMEOUTS["query"]):
+        # Writes go to the primary, reads to the read replica if one is configured
+        self.endpoints = {PRIMARY: db_config["ExampleDb"]}
+        if DB_ROUTING["replica"]:
+            self.endpoints[REPLICA] = db_config[DB_ROUTING["replica"]]
+        self.endpoint = PRIMARY  # Endpoint of the running operation
+        # Connections are opened on first use or by calling connect
+        self.connections = {}
+        self.cursors = {}
+        self.statement_cursors = {}  # Endpoint -> statement name -> cursor
+        self.active_cursor = None  # Cursor of the statement running, for cancel
+        self.executions = Counter()  # Statement name -> executions
+        self.bulk_rows = Counter()  # Statement name -> rows bound by executemany
+        self.query_timeout = query_timeout
+        # Serializes the use of the connections between threads
+        self.lock = threading.RLock()
+        self.cancel_token = None  # Token of the operation running, for cancel
+        # Held while an operation starts or ends, so cancel aborts no other one
+        self.cancel_lock = threading.Lock()
+        self.resilience = DB_RESILIENCE
+        self.breakers = {
+            PRIMARY: CircuitBreaker(
+                DB_RESILIENCE["failure_threshold"], DB_RESILIENCE["reset_timeout"]
+            ),
+            # Reads fall back to the primary as soon as the replica fails
+            REPLICA: CircuitBreaker(1, DB_RESILIENCE["reset_timeout"]),
+        }
+        self.read_your_writes = DB_ROUTING["read_your_writes"]
+        self.written = {}  # Tracking number -> time of this station's last write
+        # Shared with the connection that preloads it
+        self.arrivals = arrivals if arrivals is not None else ExpectedArrivalsCache()
+        self.results = ResultCache(RESULT_CACHE["size"], RESULT_CACHE["ttl"])
+        # Holds the notes of the preloaded pallets too
+        self.pallet_notes = ResultCache(
+            RESULT_CACHE["size"] + EXPECTED_ARRIVALS["max_tracking_numbers"],
+            RESULT_CACHE["ttl"],
+        )
+        self.sku_components = {}  # SKU -> parts, as verify_sku returns them
+
+    @property
+    def conn(self):
+        return self.connections.get(self.endpoint)
+
+    @property
+    def cursor(self):
+        return self.cursors.get(self.endpoint)
+
+    @property
+    def breaker(self):
+        return self.breakers[self.endpoint]
+
+    def route(self, read_only):
+        """The endpoint of an operation, reads go to the replica while it works."""
+        if (
+            read_only
+            and REPLICA in self.endpoints
+            and not self.breakers[REPLICA].is_open
+        ):
+            return REPLICA
+        return PRIMARY
 
     def connect(self):
-        """Establish a new connection to the database."""
-        self.conn = pyodbc.connect(create_connection_string(db_config["ExampleDb"]))
-        self.cursor = self.conn.cursor()
+        """Establish a new connection to the endpoint in use."""
+        with self.lock:
+            conn = pyodbc.connect(
+                create_connection_string(self.endpoints[self.endpoint]),
+                timeout=DB_TIMEOUTS["login"],
+            )
+            conn.timeout = self.query_timeout  # Applies to the cursors made next
+            self.connections[self.endpoint] = conn
+            self.cursors[self.endpoint] = conn.cursor()
+            self.statement_cursors[self.endpoint] = {}
+
+    def statement_cursor(self, statement):
+        """
+        The cursor of a statement on the connection in use. pyodbc keeps the last
+        statement of a cursor prepared, so it is only prepared on its first run.
+        """
+        cursors = self.statement_cursors[self.endpoint]
+        cursor = cursors.get(statement.name)
+        if cursor is None:
+            cursor = cursors[statement.name] = self.conn.cursor()
+        self.active_cursor = cursor
+        return cursor
+
+    def execute(self, statement, *params):
+        """Run a registered statement and return its cursor."""
+        cursor = self.statement_cursor(statement)
+        self.executions[statement.name] += 1
+        cursor.execute(statement.sql, *params)
+        return cursor
+
+    def fetchall(self, statement, *params):
+        return self.execute(statement, *params).fetchall()
+
+    def fetchone(self, statement, *params):
+        """
+        The first row of a registered statement, or None. The rest of the rows are
+        read too, since a cursor with pending results blocks the other cursors.
+        """
+        rows = self.fetchall(statement, *params)
+        return rows[0] if rows else None
+
+    def executemany(self, statement, rows):
+        """Run a registered statement for many rows, bound as parameter arrays."""
+        rows = list(rows)
+        if not rows:
+            return
+        cursor = self.statement_cursor(statement)
+        cursor.fast_executemany = True  # Sends the rows in one batch, not one by one
+        self.executions[statement.name] += 1
+        self.bulk_rows[statement.name] += len(rows)
+        cursor.executemany(statement.sql, rows)
+
+    def statement_stats(self):
+        """Executions and rows bound in bulk of every statement run, by name."""
+        # Copied first, since a background operation may be counting meanwhile
+        executions = dict(self.executions)
+        bulk_rows = dict(self.bulk_rows)
+        return {
+            name: (executions[name], bulk_rows.get(name, 0))
+            for name in sorted(executions, key=executions.get, reverse=True)
+        }
+
+    def cancel(self, token):
+        """
+        Abort the operation of a cancel token, from another thread. Its running
+        statement is cancelled in the driver and it raises QueryCancelled.
+        If it is still waiting for the connection it raises when it gets it.
+        """
+        with self.cancel_lock:
+            token.cancelled = True
+            cursor = self.active_cursor if self.cancel_token is token else None
+            if cursor is not None:
+                try:
+                    cursor.cancel()
+                except pyodbc.Error:
+                    pass
+
+    def start_operation(self, token):
+        """Make token the one of the operation using the connection."""
+        with self.cancel_lock:
+            self.cancel_token = token
+            self.active_cursor = None
+
+    def check_cancelled(self):
+        """Stop an operation between statements once it was cancelled."""
+        if self.cancel_token is not None and self.cancel_token.cancelled:
+            raise QueryCancelled()
+
+    def discard_connection(self):
+        """Drop a broken connection, the next operation opens a new one."""
+        with self.lock:
+            conn = self.connections.pop(self.endpoint, None)
+            self.cursors.pop(self.endpoint, None)
+            self.statement_cursors.pop(self.endpoint, None)
+            self.active_cursor = None
+            if conn:
+                try:
+                    conn.close()
+                except pyodbc.Error:
+                    pass
+
+    def rollback(self):
+        """Roll back the open transaction, if the connection is still usable."""
+        try:
+            self.conn.rollback()
+        except (pyodbc.Error, AttributeError):
+            self.discard_connection()
 
     def check_if_connected(self):
-        """Check if the database connection is active."""
-        try:
-            self.cursor.execute("SELECT 1")
-            return True
-        except (pyodbc.ProgrammingError, pyodbc.OperationalError):
+        """Check if the connection to the primary is active."""
+        cursor = self.cursors.get(PRIMARY)
+        if cursor is None or self.breakers[PRIMARY].is_open:
             return False
+        with self.lock:
+            try:
+                # Read the result so the connection isn't left busy for the
+                # cursors of the other statements
+                cursor.execute("SELECT 1").fetchall()
+                return True
+            except pyodbc.Error:
+                return False
 
     def reconnect(self):
-        """Reconnect to the database if the connection is lost."""
-        if not self.check_if_connected():
-            self.connect()
-
-    def get_pallet_note(self, tracking_number):
-        """Check if a return has a pallet note."""
-        self.cursor.execute(
-            """
-            SELECT pallet_note FROM ReturnPalletNotes WHERE tracking_number = ?
-            """,
-            tracking_number,
-        )
-        result = self.cursor.fetchone()
+        """Connect to the primary if it isn't connected or the connection is lost."""
+        # Waits for a connect already running on another thread
+        with self.lock:
+            self.endpoint = PRIMARY
+            if self.check_if_connected():
+                return
+            self.breaker.allow()
+            try:
+                self.connect()
+            except pyodbc.Error as e:
+                if not is_transient(e):
+                    raise
+                self.breaker.record_failure()
+                raise DatabaseUnavailable(f"Database unavailable: {e.args[-1]}") from e
+            self.breaker.record_success()
+
+    def get_pallet_note(self, tracking_number, cancel_token=None):
+        """
+        Get the pallet note of a return, usually cached by the search or the preload
+        that found it. Cached notes are answered without using the connection.
+        :return: The note and its row version, None if the return has no note yet.
+        """
+        cached = self.pallet_notes.get(tracking_number.upper())
+        if cached is not None:
+            return cached
+        return self.read_pallet_note(tracking_number, cancel_token=cancel_token)
+
+    @resilient(idempotent=True)
+    def read_pallet_note(self, tracking_number):
+        """Read the pallet note of a return from the database, caching it."""
+        result = self.fetchone(statements.GET_PALLET_NOTE, tracking_number)
         if result:
-            return result[0]
+            cached = (result.pallet_note or "", result.row_version)
         else:
-            self.insert_pallet_note(tracking_number, "")
-            return ""
-
-    def insert_pallet_note(self, tracking_number, pallet_note):
-        """Inserts new pallet note."""
-        self.cursor.execute(
-            """
-            INSERT INTO ReturnPalletNotes (tracking_number, pallet_note) VALUES (?, ?)
-            """,
-            tracking_number,
-            pallet_note,
+            cached = ("", None)  # Created by the first write
+        self.pallet_notes.put(tracking_number.upper(), cached)
+        return cached
+
+    def cache_pallet_note(self, tracking_number, row):
+        """Cache the pallet note the search queries join to the Returns rows."""
+        self.pallet_notes.put(
+            tracking_number.upper(), (row.pallet_note or "", row.pallet_note_version)
         )
-        self.conn.commit()
 
-    def update_pallet_note(self, tracking_number, pallet_note):
-        """Update pallet note."""
-        self.cursor.execute(
-            """
-            UPDATE ReturnPalletNotes SET pallet_note = ? WHERE tracking_number = ?
-            """,
-            pallet_note,
-            tracking_number,
+    def write_pallet_note(self, tracking_number, pallet_note, row_version):
+        """
+        Insert or update a pallet note in the running transaction, if no other
+        station wrote it since it was read at row_version.
+        :return: The new row version, or None if the note was changed meanwhile.
+        """
+        row = self.fetchone(
+            statements.UPSERT_PALLET_NOTE, tracking_number, pallet_note, row_version
         )
-        self.conn.commit()
+        return None if row is None else row.row_version
 
+    def remember_pallet_note(self, tracking_number, pallet_note, row_version):
+        """Cache a committed note, or drop it if it conflicted so it is read again."""
+        if row_version is None:
+            self.pallet_notes.pop(tracking_number.upper())
+        else:
+            self.pallet_notes.put(tracking_number.upper(), (pallet_note, row_version))
+
+    @resilient(idempotent=False)
+    def save_pallet_note(self, tracking_number, pallet_note, row_version):
+        """
+        Write a pallet note on its own, if no other station changed it since it was
+        read. Notes are usually written along with a check in instead.
+        :return: The new row version of the note.
+        :raises WriteConflict: If the note was changed meanwhile.
+        """
+        new_version = self.write_pallet_note(tracking_number, pallet_note, row_version)
+        if new_version is None:
+            self.rollback()
+            self.remember_pallet_note(tracking_number, pallet_note, None)
+            raise WriteConflict(f"The note of {tracking_number} was changed.")
+        self.conn.commit()
+        self.remember_pallet_note(tracking_number, pallet_note, new_version)
+        return new_version
+
+    def recent_writes(self):
+        """Tracking numbers this station wrote within the read-your-writes window."""
+        now = time.monotonic()
+        self.written = {
+            tracking_number: at
+            for tracking_number, at in self.written.items()
+            if now - at < self.read_your_writes
+        }
+        return self.written.keys()
+
+    def record_write(self, tracking_number):
+        self.written[tracking_number.upper()] = time.monotonic()
+
+    def replica_is_fresh(self, tracking_numbers, *args):
+        """
+        Check if returns can be read from the replica: the ones this station just
+        wrote are read from the primary, since the replica may not have them yet.
+        Used as the read_only check of operations taking tracking numbers first.
+        """
+        if isinstance(tracking_numbers, str):
+            tracking_numbers = [tracking_numbers]
+        recent_writes = self.recent_writes()
+        return not any(tn.upper() in recent_writes for tn in tracking_numbers)
+
+    def forget_recent_writes(self):
+        """
+        Drop the returns written within the read-your-writes window from the
+        expected arrivals, in case a preload read them from a lagging replica.
+        """
+        with self.lock:
+            for tracking_number in list(self.recent_writes()):
+                self.arrivals.invalidate(tracking_number)
+
+    def cached_search(self, tracking_number):
+        """
+        The return lines of an expected arrival or a recent search, answered from
+        memory without using the connection, or None if it has to be searched.
+        """
+        return_lines = self.arrivals.get(tracking_number.upper())
+        if return_lines is not None:
+            return return_lines
+        return_lines = self.results.get(tracking_number.upper())
+        if return_lines is not None:
+            return copy_lines(return_lines)
+        return None
+
+    @resilient(idempotent=True, read_only=replica_is_fresh)
     def search_tracking_number(self, tracking_number):
-        """Search for a tracking number in the database."""
-        tracking_number.upper()
-        self.cursor.execute(
-            """
-            SELECT id, return_id_number, sku, po, received, status, note FROM Returns 
-            WHERE tracking_number = ?
-            """,
-            tracking_number,
-        )
+        """
+        Search for a tracking number in the database, caching the result.
+        Cached searches are answered by cached_search beforehand.
+        """
+        cursor = self.execute(statements.SEARCH_RETURNS, tracking_number)
         results = []
         try:
-            for row in self.cursor.fetchall():
+            rows = cursor.fetchall()
+            if rows:
+                self.cache_pallet_note(tracking_number, rows[0])
+            for row in rows:
                 if not row.status:
                     row.status = "Select Status"
                 if not row.note:
@@ -91,6 +369,7 @@ class ExampleDb:
                         "received": row.received,
                         "status": row.status,
                         "note": row.note,
+                        "row_version": row.row_version,
                     }
                 )
 
@@ -100,34 +379,26 @@ class ExampleDb:
         if not results:
             return None
 
-        results_tuples = []
+        # Counted once per return, the rows of a pallet mostly share it
+        sku_amounts = self.get_sku_amounts_bulk(
+            {result["return_id_number"] for result in results}
+        )
+
+        return_lines = []
         for result in results:
+            self.check_cancelled()
             result["components"] = self.get_components(result["id"])
             result["wrong_parts"] = self.get_wrong_parts(result["id"])
-            result["expected_sku_amount"] = self.get_expected_sku_amount(
-                result["return_id_number"]
-            )
-            result["sku_amount_received"] = self.get_skus_received(
-                result["return_id_number"]
-            )
-            results_tuples.append(self.return_tuple(result))
-
-        return results_tuples
-
-    def return_tuple(self, result):
-        if result["wrong_parts"]:
-            return (
-                result["sku"],
-                result["return_id_number"],
-                result["expected_sku_amount"],
-                result["sku_amount_received"],
-                result["status"],
-                result["note"],
-                result["received"],
-                result["components"],
-                result["wrong_parts"],
-            )
-        return (
+            expected, received = sku_amounts[result["return_id_number"]]
+            result["expected_sku_amount"] = expected
+            result["sku_amount_received"] = received
+            return_lines.append(self.return_line(result))
+
+        self.results.put(tracking_number.upper(), copy_lines(return_lines))
+        return return_lines
+
+    def return_line(self, result):
+        return ReturnLine(
             result["sku"],
             result["return_id_number"],
             result["expected_sku_amount"],
@@ -135,75 +406,262 @@ class ExampleDb:
             result["status"],
             result["note"],
             result["received"],
-            result["wrong_parts"],
             result["components"],
+            result["wrong_parts"],
+            id=result["id"],
+            row_version=result["row_version"],
         )
 
     def get_components(self, id):
-        self.cursor.execute(
-            """
-            SELECT parts, condition FROM ReturnItems 
-            WHERE return_id = ?
-            """,
-            id,
-        )
         components = {}
-        for row in self.cursor.fetchall():
+        for row in self.fetchall(statements.GET_COMPONENTS, id):
             if not row.condition:
                 row.condition = "Good"
             components[row.parts] = row.condition
         return components
 
     def get_wrong_parts(self, id):
-        self.cursor.execute(
-            """
-            SELECT parts, condition FROM ReturnWrongItemsReceived 
-            WHERE return_id = ?
-            """,
-            id,
+        rows = self.fetchall(statements.GET_WRONG_PARTS, id)
+        wrong_parts = {row.parts: row.condition for row in rows}
+        return wrong_parts
+
+    def select_in(self, statement, values, chunk_size=1000):
+        """
+        Run a query with an IN list in chunks and return all the rows.
+        :param statement: Statement with a single {} placeholder for the IN list.
+        :param values: Values to bind to the IN list.
+        :param chunk_size: Max parameters per statement (SQL Server allows 2100).
+        Full chunks all have the same SQL, so the statement stays prepared.
+        """
+        rows = []
+        for start in range(0, len(values), chunk_size):
+            chunk = values[start : start + chunk_size]
+            cursor = self.statement_cursor(statement)
+            self.executions[statement.name] += 1
+            cursor.execute(
+                statement.sql.format(", ".join("?" * len(chunk))),
+                *chunk,
+            )
+            rows.extend(cursor.fetchall())
+        return rows
+
+    def get_components_bulk(self, ids):
+        """Get the components of several returns at once, keyed by return id."""
+        components = {id: {} for id in ids}
+        rows = self.select_in(
+            statements.GET_COMPONENTS_BULK,
+            list(components),
+        )
+        for row in rows:
+            components[row.return_id][row.parts] = row.condition or "Good"
+        return components
+
+    @resilient(idempotent=True)
+    def get_sku_amounts(self, return_id_numbers):
+        """
+        Count the SKUs expected and received of several returns, to reconcile the
+        counts kept by an open pallet with the database. Read from the primary, so
+        the counts don't go back to before this station's check ins.
+        """
+        return self.get_sku_amounts_bulk(return_id_numbers)
+
+    @resilient(idempotent=True, read_only=True)
+    def get_checklist_data(self, tracking_numbers):
+        """
+        Fetch the SKUs and components of several tracking numbers in bulk.
+        :return: Dict of tracking number -> (return_id_number, return lines), where
+        only the SKU and components of the return lines are filled in.
+        Tracking numbers that are not found are left out.
+        """
+        tracking_numbers = list(dict.fromkeys(tn.upper() for tn in tracking_numbers))
+        if not tracking_numbers:
+            return {}
+
+        rows = self.select_in(
+            statements.GET_CHECKLIST_RETURNS,
+            tracking_numbers,
+        )
+        components = self.get_components_bulk([row.id for row in rows])
+
+        pallets = {}
+        for row in rows:
+            tracking_number = row.tracking_number.upper()
+            if tracking_number not in pallets:
+                pallets[tracking_number] = (row.return_id_number, [])
+            pallets[tracking_number][1].append(
+                ReturnLine(
+                    f"{row.sku}@{row.po}",
+                    row.return_id_number,
+                    components=components[row.id],
+                )
+            )
+
+        # Keep the order the tracking numbers were given in
+        return {tn: pallets[tn] for tn in tracking_numbers if tn in pallets}
+
+    def get_wrong_parts_bulk(self, ids):
+        """Get the wrong parts received of several returns at once, keyed by return id."""
+        wrong_parts = {id: {} for id in ids}
+        rows = self.select_in(
+            statements.GET_WRONG_PARTS_BULK,
+            list(wrong_parts),
         )
-        wrong_parts = {row.parts: row.condition for row in self.cursor.fetchall()}
+        for row in rows:
+            wrong_parts[row.return_id][row.parts] = row.condition
         return wrong_parts
 
-    def get_expected_sku_amount(self, return_id_number):
-        self.cursor.execute(
-            """
-            SELECT count(*) FROM Returns
-            WHERE return_id_number = ?
-            """,
-            return_id_number,
+    def get_sku_amounts_bulk(self, return_id_numbers):
+        """
+        Count the SKUs expected and received of several returns in grouped queries.
+        :return: Dict of return id number -> (expected amount, received amount).
+        """
+        rows = self.select_in(
+            statements.COUNT_SKUS_BULK,
+            list(return_id_numbers),
         )
-        expected_sku_amount = self.cursor.fetchone()[0]
-        return expected_sku_amount
-
-    def get_skus_received(self, return_id_number):
-        self.cursor.execute(
-            """
-            SELECT count(*) FROM Returns
-            WHERE return_id_number = ? and received = 1
-            """,
-            return_id_number,
+        return {row.return_id_number: (row.expected, row.received or 0) for row in rows}
+
+    @resilient(idempotent=True, read_only=replica_is_fresh)
+    def search_tracking_numbers(self, tracking_numbers):
+        """
+        Search for several tracking numbers with a few set-based queries.
+        :return: Dict of tracking number -> the return lines search_tracking_number
+        would return, or None if the tracking number is not found. Keeps the order
+        the tracking numbers were given in.
+        """
+        tracking_numbers = list(dict.fromkeys(tn.upper() for tn in tracking_numbers))
+        if not tracking_numbers:
+            return {}
+
+        rows = self.select_in(
+            statements.SEARCH_RETURNS_BULK,
+            tracking_numbers,
         )
-        sku_amount_received = self.cursor.fetchone()[0]
-        return sku_amount_received
+        # Every row of a tracking number carries the same note
+        for row in {row.tracking_number.upper(): row for row in rows}.values():
+            self.cache_pallet_note(row.tracking_number, row)
+        found = self.group_return_lines(rows)
+        return {tn: found.get(tn) for tn in tracking_numbers}
+
+    @resilient(idempotent=True, read_only=replica_is_fresh)
+    def get_changed_return_lines(self, tracking_number, row_version):
+        """
+        The return lines of a tracking number changed after a row version, to follow
+        the progress other stations make on an open pallet. Only committed changes
+        are returned, since row versions are assigned before their transaction
+        commits.
+        :return: The changed lines, and the row version the next poll continues
+        after.
+        """
+        active = self.fetchone(statements.GET_ACTIVE_ROW_VERSION).row_version
+        rows = self.fetchall(
+            statements.GET_CHANGED_RETURNS, tracking_number, row_version, active
+        )
+        next_version = max(row_version, active - 1)
+        if not rows:
+            return [], next_version
+        return self.group_return_lines(rows)[tracking_number.upper()], next_version
+
+    def group_return_lines(self, rows):
+        """
+        Build the return lines of Returns rows, fetching their components, wrong
+        parts and SKU counts in bulk.
+        :return: Dict of tracking number -> return lines.
+        """
+        ids = [row.id for row in rows]
+        components = self.get_components_bulk(ids)
+        wrong_parts = self.get_wrong_parts_bulk(ids)
+        sku_amounts = self.get_sku_amounts_bulk({row.return_id_number for row in rows})
+
+        found = {}
+        for row in rows:
+            expected_sku_amount, sku_amount_received = sku_amounts[row.return_id_number]
+            found.setdefault(row.tracking_number.upper(), []).append(
+                self.return_line(
+                    {
+                        "id": row.id,
+                        "return_id_number": row.return_id_number,
+                        "sku": f"{row.sku}@{row.po}",
+                        "received": row.received,
+                        "status": row.status or "Select Status",
+                        "note": row.note or "",
+                        "components": components[row.id],
+                        "wrong_parts": wrong_parts[row.id],
+                        "expected_sku_amount": expected_sku_amount,
+                        "sku_amount_received": sku_amount_received,
+                        "row_version": row.row_version,
+                    }
+                )
+            )
+        return found
+
+    @resilient(idempotent=True, read_only=True)
+    def preload_expected_arrivals(
+        self, limit=EXPECTED_ARRIVALS["max_tracking_numbers"]
+    ):
+        """
+        Load the returns with SKUs not received yet into the expected arrivals
+        cache, so searches for them are served from memory. Only the newest limit
+        tracking numbers are loaded, returns left open for long are searched.
+        :return: The number of tracking numbers cached.
+        """
+        rows = self.fetchall(statements.PRELOAD_EXPECTED_ARRIVALS, limit)
+        found = self.group_return_lines(rows)
+        # Every row of a tracking number carries the same note, only pallets show it
+        for row in {row.tracking_number.upper(): row for row in rows}.values():
+            if len(found[row.tracking_number.upper()]) > 1:
+                self.cache_pallet_note(row.tracking_number, row)
+        self.arrivals.load(found)
+        return len(self.arrivals)
+
+    def forget_return(self, tracking_number):
+        """
+        Drop the cached searches of a return that changed, including the ones of
+        other tracking numbers of the same return, whose received counts changed too.
+        The return is read from the primary until the replica has caught up with it.
+        """
+        tracking_number = tracking_number.upper()
+        self.record_write(tracking_number)
+        self.arrivals.invalidate(tracking_number)
+        return_lines = self.results.pop(tracking_number)
+        if return_lines:
+            ids = {line.return_id_number for line in return_lines}
+            self.results.invalidate_if(
+                lambda lines: any(line.return_id_number in ids for line in lines)
+            )
 
-    def check_in_return(self, tracking_number, status, note, sku, components):
-        """Check in a return to the database."""
+    @resilient(idempotent=False)
+    def check_in_return(
+        self,
+        tracking_number,
+        status,
+        note,
+        sku,
+        components,
+        row_version,
+        pallet_note=None,
+    ):
+        """
+        Check in a return to the database, in a single transaction.
+        Only done if the SKU is still at the row version it was read at.
+        :param pallet_note: The note and row version of a pallet note to write in
+        the same transaction. If another station changed the note meanwhile, the
+        SKU is still checked in and the note is read again by get_pallet_note.
+        :return: The new row version of the SKU, or False if it wasn't checked in.
+        :raises WriteConflict: If another station changed the SKU meanwhile.
+        """
 
         try:
             sku_and_po = sku.split("@")
             sku = sku_and_po[0]
             po = sku_and_po[1]
 
-            if self.it_has_wrong_parts(tracking_number, sku, po):
-                self.delete_wrong_parts(tracking_number, sku, po)
+            had_wrong_parts = self.it_has_wrong_parts(tracking_number, sku, po)
 
             checkin_station = socket.gethostname()
 
-            self.cursor.execute(
-                """
-                UPDATE Returns SET received = 1, received_date= ?, status = ?, note = ?, checkin_station = ? WHERE tracking_number = ? AND sku = ? AND po = ?
-                """,
+            row = self.fetchone(
+                statements.CHECK_IN_RETURN,
                 datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                 status,
                 note,
@@ -211,23 +669,20 @@ class ExampleDb:
                 tracking_number,
                 sku,
                 po,
+                row_version,
             )
+            if row is None:
+                self.conflict(tracking_number, f"{sku}@{po}")
 
-            self.conn.commit()
+            if had_wrong_parts:
+                self.delete_wrong_parts(tracking_number, sku, po, commit=False)
 
             if status == "Wrong Part":
                 components_data = [
                     (tracking_number, sku, po, component, condition)
                     for component, condition in components.items()
                 ]
-                self.cursor.executemany(
-                    """
-                    INSERT INTO ReturnWrongItemsReceived (return_id, parts, condition) VALUES ((SELECT id FROM Returns WHERE tracking_number = ? AND sku = ? AND po = ?), ?, ?)
-                    """,
-                    components_data,
-                )
-
-                self.conn.commit()
+                self.executemany(statements.INSERT_WRONG_PARTS, components_data)
 
             else:
 
@@ -235,77 +690,133 @@ class ExampleDb:
                     (condition, tracking_number, sku, po, component)
                     for component, condition in components.items()
                 ]
-                self.cursor.executemany(
-                    """
-                    UPDATE ReturnItems SET condition = ? WHERE return_id = (SELECT id FROM Returns WHERE tracking_number = ? AND  sku = ? AND po= ?) AND parts = ?
-                    """,
-                    components_data,
-                )
+                self.executemany(statements.UPDATE_COMPONENTS, components_data)
+
+            if pallet_note is not None:
+                note_version = self.write_pallet_note(tracking_number, *pallet_note)
 
-                self.conn.commit()
+            # The status, the parts and the pallet note are committed together
+            self.conn.commit()
 
         except pyodbc.IntegrityError:
+            self.rollback()
             return False
+        except pyodbc.Error:
+            self.rollback()
+            raise
 
-        return True
+        if pallet_note is not None:
+            self.remember_pallet_note(tracking_number, pallet_note[0], note_version)
+        self.forget_return(tracking_number)
+        return row.row_version
+
+    @resilient(idempotent=False)
+    def undo_check_in(
+        self, tracking_number, sku, status, note, components, row_version
+    ):
+        """
+        Revert a check in, restoring the status, note and component conditions.
+        :return: The new row version of the SKU, or False if it wasn't undone.
+        :raises WriteConflict: If another station changed the SKU since the check in.
+        """
+
+        try:
+            sku, po = sku.split("@")
+
+            row = self.fetchone(
+                statements.UNDO_CHECK_IN,
+                None if status == "Select Status" else status,
+                note or None,
+                tracking_number,
+                sku,
+                po,
+                row_version,
+            )
+            if row is None:
+                self.conflict(tracking_number, f"{sku}@{po}")
+
+            components_data = [
+                (condition, tracking_number, sku, po, component)
+                for component, condition in components.items()
+            ]
+            if components_data:
+                self.executemany(statements.UPDATE_COMPONENTS, components_data)
+
+            self.conn.commit()
+
+        except pyodbc.IntegrityError:
+            self.rollback()
+            return False
+        except pyodbc.Error:
+            self.rollback()
+            raise
+
+        self.forget_return(tracking_number)
+        return row.row_version
+
+    def conflict(self, tracking_number, sku):
+        """
+        Give up a write that matched no row version, dropping the stale cached
+        searches so the return is read again from the primary.
+        """
+        self.rollback()
+        self.forget_return(tracking_number)
+        raise WriteConflict(f"{sku} was changed by another station.")
 
     def it_has_wrong_parts(self, tracking_number, sku, po):
         """Check if a return is a wrong part return."""
-        self.cursor.execute(
-            """
-            SELECT status FROM Returns WHERE tracking_number = ? AND sku = ? AND po = ?
-            """,
-            tracking_number,
-            sku,
-            po,
-        )
         try:
-            result = self.cursor.fetchone()[0]
+            result = self.fetchone(statements.GET_STATUS, tracking_number, sku, po)[0]
         except TypeError:
             return False
 
         return result == "Wrong Part"
 
-    def delete_wrong_parts(self, tracking_number, sku, po):
+    def delete_wrong_parts(self, tracking_number, sku, po, commit=True):
         """Delete wrong parts from the database."""
-        self.cursor.execute(
-            """
-            DELETE FROM ReturnWrongItemsReceived WHERE return_id = (SELECT id FROM Returns WHERE tracking_number = ? AND sku = ? AND po = ?)
-            """,
-            tracking_number,
-            sku,
-            po,
-        )
-        self.conn.commit()
+        self.execute(statements.DELETE_WRONG_PARTS, tracking_number, sku, po)
+        if commit:
+            self.conn.commit()
+        self.forget_return(tracking_number)
 
+    @resilient(idempotent=True, read_only=True)
     def verify_sku(self, sku):
         """Verify if a SKU is in the database."""
-        self.cursor.execute(
-            """
-            SELECT component FROM components WHERE sku = ?
-            """,
-            sku,
-        )
+        if sku in self.sku_components:
+            return dict.fromkeys(self.sku_components[sku])
+
         result = {}
-        for row in self.cursor.fetchall():
+        for row in self.fetchall(statements.VERIFY_SKU, sku):
             if row[0] is not None:
                 result[row[0]] = None
             else:
                 result[sku] = None
 
+        if result:
+            self.sku_components[sku] = list(result)
         return result
 
+    @resilient(idempotent=True, read_only=True)
+    def get_sku_components(self):
+        """
+        The parts of every SKU, from the table and in the shape verify_sku caches
+        them: a SKU without components is its own single part.
+        """
+        sku_components = {}
+        for row in self.fetchall(statements.GET_SKU_COMPONENTS):
+            parts = sku_components.setdefault(row.sku, [])
+            part = row.sku if row.component is None else row.component
+            if part not in parts:
+                parts.append(part)
+        return sku_components
+
+    @resilient(idempotent=True, read_only=True)
     def get_sku_component_map(self):
-        """Inserts the sales data into the Sales database."""
-        self.spinner.start(
-            "Getting SKU ASIN Component Map from the Product Catalog database"
-        )
+        """Get the components of every SKU from the product catalog."""
         try:
-            self.cursor.execute(
-                "select * from vProductAndAliasWithComponentsView",
-            )
+            rows = self.execute(statements.GET_SKU_COMPONENT_MAP)
             sku_component_map = {}
-            for row in self.cursor:
+            for row in rows:
                 if row.component is not None and row.sku not in sku_component_map:
                     sku_component_map[row.sku] = [row.component]
                 elif row.component is not None and row.sku in sku_component_map:
@@ -314,15 +825,56 @@ class ExampleDb:
             return sku_component_map
 
         except pyodbc.Error as e:
-            print(f"Error inserting sales FBA sales data: {e}")
+            print(f"Error getting the SKU component map: {e}")
             raise
 
-    def close(self):
-        """Close the database connection."""
-        if self.conn:
-            self.conn.close()
-            self.conn = None
-            self.cursor = None
-
+    def export_caches(self):
+        """The station caches as plain data, to be saved in a snapshot."""
+        arrivals, loaded_at = self.arrivals.export()
+        return {
+            "sku_components": dict(self.sku_components),
+            "results": [
+                [tracking_number, age, [line.to_row() for line in lines]]
+                for tracking_number, age, lines in self.results.export()
+            ],
+            "arrivals": {
+                tracking_number: [line.to_row() for line in lines]
+                for tracking_number, lines in arrivals.items()
+            },
+            "arrivals_loaded_at": loaded_at,
+        }
+
+    def import_caches(self, snapshot, max_age):
+        """
+        Warm the station caches from a snapshot, before the database is reached.
+        The open returns are only used if they were loaded less than max_age
+        seconds ago, since other stations check them in meanwhile.
+        """
+        age = time.time() - snapshot["saved_at"]
+        self.sku_components.update(snapshot["sku_components"])
+        for tracking_number, cached_age, rows in snapshot["results"]:
+            self.results.put(
+                tracking_number,
+                [ReturnLine.from_row(row) for row in rows],
+                age=cached_age + age,
+            )
+        loaded_at = snapshot["arrivals_loaded_at"]
+        if not loaded_at or time.time() - loaded_at > max_age:
+            return
+        self.arrivals.load(
+            {
+                tracking_number: [ReturnLine.from_row(row) for row in rows]
+                for tracking_number, rows in snapshot["arrivals"].items()
+            },
+            loaded_at,
+        )
 
-ex_db = ExampleDb()
+    def close(self):
+        """Close the database connections."""
+        with self.lock:
+            for conn in self.connections.values():
+                conn.close()
+            self.connections.clear()
+            self.cursors.clear()
+            self.statement_cursors.clear()
+            self.active_cursor = None
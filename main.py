@@ -1,8 +1,14 @@
+import time
+
+STARTUP = time.perf_counter()  # Taken before the imports to time them too
+
 import sys
 from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer
 from ui import MainWindow
 from PyQt5.QtGui import QFont
 from PyQt5.QtGui import QIcon
+from startup_timer import StartupTimer
 import os
 
 # To package
@@ -16,6 +22,8 @@ def resource_path(relative_path):
 
 
 def main():
+    startup_timer = StartupTimer(STARTUP)
+    startup_timer.mark("imports")
     app = QApplication(sys.argv)
     global_font = QFont("Arial", 18, QFont.Normal)
     app.setWindowIcon(QIcon(resource_path("RC.ico")))
@@ -49,6 +57,14 @@ def main():
         background-color: #f0f0f0; /* Same as background */
     }
 
+    /* Status label colors, picked by the label's "state" property */
+    QLabel[state="ok"] {
+        color: green;
+    }
+    QLabel[state="error"] {
+        color: red;
+    }
+
     /* Combo Box styles */
     QComboBox {
         background-color: white; /* White background for combo box */
@@ -80,8 +96,11 @@ def main():
     }
 """
     )
-    window = MainWindow()
+    startup_timer.mark("application")
+    window = MainWindow(startup_timer)
+    startup_timer.mark("widgets")
     window.show()
+    QTimer.singleShot(0, startup_timer.ready)
     sys.exit(app.exec_())
 
 
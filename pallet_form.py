@@ -4,20 +4,39 @@ import time
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.platypus import (
+    SimpleDocTemplate,
+    Table,
+    TableStyle,
+    Paragraph,
+    Spacer,
+    PageBreak,
+)
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.graphics.shapes import Drawing, Rect
-from email_helper import send_email
+from email_helper import report_error
 import traceback
 
 
-def create_pdf_report(filename, return_id_number, tracking_number, results):
-    """Create a temporary PDF report for printing."""
-    # Create a PDF document
-    pdf_file = SimpleDocTemplate(filename, pagesize=letter)
+def create_checkbox():
+    """Create a simulated checkbox drawing for the checklist tables."""
+    d = Drawing(10, 10)
+    d.add(
+        Rect(
+            0,
+            0,
+            10,
+            10,
+            strokeWidth=1,
+            strokeColor=colors.black,
+            fillColor=colors.white,
+        )
+    )
+    return d
 
-    # Set up a stylesheet and styles for the document
-    styles = getSampleStyleSheet()
+
+def build_report_elements(styles, return_id_number, tracking_number, results):
+    """Build the flowables of one return's checklist section."""
     elements = []
 
     # Define the main header data
@@ -34,26 +53,10 @@ def create_pdf_report(filename, return_id_number, tracking_number, results):
     # Add space between the header and the tables
     elements.append(Spacer(1, 12))  # 12 points space
 
-    # Helper function to create a simulated checkbox
-    def create_checkbox():
-        d = Drawing(10, 10)
-        d.add(
-            Rect(
-                0,
-                0,
-                10,
-                10,
-                strokeWidth=1,
-                strokeColor=colors.black,
-                fillColor=colors.white,
-            )
-        )
-        return d
-
     # Process SKUs and components
     for result in results:
-        sku = sku_cleanner(result[0])
-        components = [component for component, _ in result[-1].items()]
+        sku = result.clean_sku
+        components = list(result.components)
 
         # SKU Header
         sku_header = [["Sku", "Complete", "Incomplete", "Wrong Product", "Wrong Part"]]
@@ -104,10 +107,42 @@ def create_pdf_report(filename, return_id_number, tracking_number, results):
         elements.append(table)
         elements.append(Spacer(1, 12))  # Add space between tables
 
+    return elements
+
+
+def create_pdf_report(filename, return_id_number, tracking_number, results):
+    """Create a temporary PDF report for printing."""
+    # Create a PDF document
+    pdf_file = SimpleDocTemplate(filename, pagesize=letter)
+
+    # Set up a stylesheet and styles for the document
+    styles = getSampleStyleSheet()
+    elements = build_report_elements(styles, return_id_number, tracking_number, results)
+
     # Build the PDF
     pdf_file.build(elements)
 
 
+def create_batch_pdf_report(filename, pallets):
+    """
+    Create one PDF with a checklist section per pallet.
+    :param pallets: List of (return_id_number, tracking_number, results) tuples.
+    """
+    pdf_file = SimpleDocTemplate(filename, pagesize=letter)
+    styles = getSampleStyleSheet()
+    elements = []
+
+    for index, (return_id_number, tracking_number, results) in enumerate(pallets):
+        # Every pallet starts on its own page
+        if index:
+            elements.append(PageBreak())
+        elements.extend(
+            build_report_elements(styles, return_id_number, tracking_number, results)
+        )
+
+    pdf_file.build(elements)
+
+
 def try_delete_file(pdf_filename, max_retries=5, delay=2):
     """Attempt to delete the PDF file, retrying if the file is in use."""
     retries = 0
@@ -125,15 +160,11 @@ def try_delete_file(pdf_filename, max_retries=5, delay=2):
     )
 
 
-def sku_cleanner(sku):
-    sku_and_po = sku.split("@")
-    return sku_and_po[0]
-
-
-def generate_and_print_pdf(
-    return_id_number, tracking_number, results, delay_before_delete=3
-):
-    """Generate the PDF, print it, and delete it after printing."""
+def print_report(create_report, delay_before_delete=3):
+    """
+    Render a report into a temporary PDF, print it, and delete it after printing.
+    :param create_report: Callable that writes the PDF to the filename it receives.
+    """
     try:
         # Create a temporary file for the PDF
         with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp_pdf:
@@ -141,7 +172,7 @@ def generate_and_print_pdf(
 
         try:
             # Create the PDF
-            create_pdf_report(pdf_filename, return_id_number, tracking_number, results)
+            create_report(pdf_filename)
 
             # Print the PDF using the default viewer
             os.startfile(pdf_filename, "print")
@@ -154,7 +185,27 @@ def generate_and_print_pdf(
             try_delete_file(pdf_filename)
 
     except Exception as e:
-        send_email(send_email("Unexpected Error", traceback.format_exc()))
+        report_error("Unexpected Error", traceback.format_exc())
+
+
+def generate_and_print_pdf(
+    return_id_number, tracking_number, results, delay_before_delete=3
+):
+    """Generate the PDF, print it, and delete it after printing."""
+    print_report(
+        lambda filename: create_pdf_report(
+            filename, return_id_number, tracking_number, results
+        ),
+        delay_before_delete,
+    )
+
+
+def generate_and_print_batch_pdf(pallets, delay_before_delete=3):
+    """Generate one combined checklist for several pallets and print it as a single job."""
+    print_report(
+        lambda filename: create_batch_pdf_report(filename, pallets),
+        delay_before_delete,
+    )
 
 
 # from openpyxl import Workbook
@@ -0,0 +1,159 @@
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QSize
+from PyQt5.QtGui import QColor, QPen
+from PyQt5.QtWidgets import QStyledItemDelegate, QListView, QAbstractItemView
+
+# Custom data roles of the pallet list
+READY_ROLE = Qt.UserRole + 1  # True if the SKU is received or ready to check in
+SELECTED_ROLE = Qt.UserRole + 2  # True for the SKU shown in the form
+
+
+class PalletListModel(QAbstractListModel):
+    """
+    Exposes the rows of a pallet session to a list view without creating widgets.
+    Loading or clearing a pallet is a model reset that does not depend on its size,
+    and a status change only repaints the changed row.
+    When a filter is set only the given session rows are shown, so positions in
+    the view are mapped to session rows with session_row and position_of.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.session = None
+        self.selected_row = 0
+        self.visible_rows = None  # Shown session rows, None when not filtered
+        self.positions = None  # Session row -> position in visible_rows
+
+    def set_session(self, session):
+        self.beginResetModel()
+        self.session = session
+        self.selected_row = 0
+        self.visible_rows = None
+        self.positions = None
+        self.endResetModel()
+
+    def clear(self):
+        self.set_session(None)
+
+    def set_filter(self, rows):
+        """Show only the given sorted session rows, or every row if rows is None."""
+        self.beginResetModel()
+        self.visible_rows = rows
+        self.positions = (
+            None if rows is None else {row: pos for pos, row in enumerate(rows)}
+        )
+        self.endResetModel()
+
+    def session_row(self, position):
+        return position if self.visible_rows is None else self.visible_rows[position]
+
+    def position_of(self, row):
+        """Position of a session row in the view, or None if it is filtered out."""
+        if self.positions is None:
+            return row if self.session is not None and row < len(self.session) else None
+        return self.positions.get(row)
+
+    def index_of(self, row):
+        position = self.position_of(row)
+        return QModelIndex() if position is None else self.index(position)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.session is None:
+            return 0
+        if self.visible_rows is not None:
+            return len(self.visible_rows)
+        return len(self.session)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.session_row(index.row())
+        if role == Qt.DisplayRole:
+            return self.session.skus[row]
+        if role == READY_ROLE:
+            return self.session.is_ready(row)
+        if role == SELECTED_ROLE:
+            return row == self.selected_row
+        return None
+
+    def is_ready(self, row):
+        return self.session.is_ready(row)
+
+    def set_ready(self, row, ready):
+        """Update the status indicator of a row, repainting it only if it changed."""
+        if self.session.set_ready(row, ready):
+            self.emit_row_changed(row, READY_ROLE)
+
+    def select(self, row):
+        """Move the selection marker, repainting only the two affected rows."""
+        previous_row = self.selected_row
+        self.selected_row = row
+        if previous_row != row:
+            self.emit_row_changed(previous_row, SELECTED_ROLE)
+        self.emit_row_changed(row, SELECTED_ROLE)
+
+    def emit_row_changed(self, row, role):
+        index = self.index_of(row)
+        if index.isValid():
+            self.dataChanged.emit(index, index, [role])
+
+
+class PalletItemDelegate(QStyledItemDelegate):
+    """Paints a pallet row as the SKU text followed by its status block."""
+
+    ready_color = QColor("green")
+    pending_color = QColor("red")
+    selected_background = QColor("white")
+    selected_border = QPen(QColor("black"), 1)
+    text_color = QColor("#333333")
+    padding = 6
+    block_size = 18
+
+    def paint(self, painter, option, index):
+        painter.save()
+        rect = option.rect.adjusted(0, 1, -1, -1)
+
+        if index.data(SELECTED_ROLE):
+            painter.fillRect(rect, self.selected_background)
+            painter.setPen(self.selected_border)
+            painter.drawRect(rect)
+
+        # Status block on the right
+        block_top = rect.top() + (rect.height() - self.block_size) // 2
+        block_left = rect.right() - self.padding - self.block_size
+        painter.fillRect(
+            block_left,
+            block_top,
+            self.block_size,
+            self.block_size,
+            self.ready_color if index.data(READY_ROLE) else self.pending_color,
+        )
+
+        # SKU text on the left
+        text_rect = rect.adjusted(
+            self.padding, 0, -(2 * self.padding + self.block_size), 0
+        )
+        painter.setFont(option.font)
+        painter.setPen(self.text_color)
+        text = option.fontMetrics.elidedText(
+            index.data(Qt.DisplayRole), Qt.ElideRight, text_rect.width()
+        )
+        painter.drawText(text_rect, Qt.AlignLeft | Qt.AlignVCenter, text)
+
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        return QSize(
+            option.rect.width(), option.fontMetrics.height() + 2 * self.padding
+        )
+
+
+class PalletListView(QListView):
+    """List view tuned for pallets with thousands of SKUs."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setUniformItemSizes(True)  # Lets the view skip measuring every row
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setItemDelegate(PalletItemDelegate(self))
@@ -0,0 +1,160 @@
+from collections import defaultdict
+
+GRAM_SIZE = 3  # Longest substring kept in the search index
+
+
+def grams(text):
+    """All the substrings of text up to GRAM_SIZE characters long."""
+    return {
+        text[start : start + size]
+        for size in range(1, GRAM_SIZE + 1)
+        for start in range(len(text) - size + 1)
+    }
+
+
+class PalletSession:
+    """
+    The return lines of an open pallet, with lookup indexes and counters that are
+    built once when the pallet is loaded and then kept up to date row by row.
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.skus = []  # Clean SKU of every row
+        self.rows_by_sku = {}  # Clean SKU -> first row with that SKU
+        self.rows_by_gram = defaultdict(set)  # SKU or component substring -> rows
+        self.rows_by_status = defaultdict(set)
+        self.ready_rows = set()  # Rows received or ready to check in
+        self.received_rows = set()
+        # Return id number -> [expected, received] SKUs of the whole return, which
+        # may have SKUs under other tracking numbers too
+        self.sku_amounts = {}
+
+        for row, line in enumerate(lines):
+            sku = line.sku.partition("@")[0]
+            self.skus.append(sku)
+            self.rows_by_sku.setdefault(sku, row)
+            self.sku_amounts.setdefault(
+                line.return_id_number,
+                [line.expected_sku_amount, line.sku_amount_received],
+            )
+            self.rows_by_status[line.status].add(row)
+            self.index_text(row, sku)
+            for part in line.components:
+                self.index_text(row, part)
+            if line.received:
+                self.received_rows.add(row)
+                self.ready_rows.add(row)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def index_text(self, row, text):
+        for gram in grams(text.lower()):
+            self.rows_by_gram[gram].add(row)
+
+    def contains(self, sku):
+        """Check if a clean SKU is on the pallet."""
+        return sku in self.rows_by_sku
+
+    def row_of(self, sku):
+        """Return the row of a clean SKU, or None if it is not on the pallet."""
+        return self.rows_by_sku.get(sku)
+
+    def is_ready(self, row):
+        return row in self.ready_rows
+
+    def set_ready(self, row, ready):
+        """Update the ready state of a row. Returns True if it changed."""
+        if (row in self.ready_rows) == ready:
+            return False
+        if ready:
+            self.ready_rows.add(row)
+        else:
+            self.ready_rows.discard(row)
+        return True
+
+    def rows_to_check_in(self):
+        """
+        Sorted rows ready to check in, leaving out the received ones, which this
+        or another station already checked in.
+        """
+        return sorted(self.ready_rows - self.received_rows)
+
+    @property
+    def ready_count(self):
+        return len(self.ready_rows)
+
+    @property
+    def received_count(self):
+        return len(self.received_rows)
+
+    def set_status(self, row, status):
+        line = self.lines[row]
+        if line.status != status:
+            self.rows_by_status[line.status].discard(row)
+            self.rows_by_status[status].add(row)
+            line.status = status
+
+    def set_received(self, row, received):
+        line = self.lines[row]
+        if bool(line.received) != bool(received):
+            self.sku_amounts[line.return_id_number][1] += 1 if received else -1
+        if received:
+            self.received_rows.add(row)
+        else:
+            self.received_rows.discard(row)
+        line.received = received
+
+    def sku_amounts_of(self, row):
+        """The (expected, received) SKU counts of the return of a row."""
+        expected, received = self.sku_amounts[self.lines[row].return_id_number]
+        return expected, received
+
+    def reconcile_sku_amounts(self, sku_amounts):
+        """
+        Replace the counts kept since the pallet was loaded with the database's,
+        which include the SKUs received under other tracking numbers.
+        """
+        for return_id_number, (expected, received) in sku_amounts.items():
+            if return_id_number in self.sku_amounts:
+                self.sku_amounts[return_id_number] = [expected, received]
+
+    def matching_rows(self, text):
+        """
+        Rows whose SKU or one of whose components contains text, ignoring case.
+        Candidates come from the substring index, so only rows sharing every
+        indexed substring of text are checked.
+        """
+        text = text.strip().lower()
+        if not text:
+            return set(range(len(self.lines)))
+        if len(text) <= GRAM_SIZE:
+            return set(self.rows_by_gram.get(text, ()))
+
+        candidates = None
+        for start in range(len(text) - GRAM_SIZE + 1):
+            rows = self.rows_by_gram.get(text[start : start + GRAM_SIZE], set())
+            candidates = set(rows) if candidates is None else candidates & rows
+            if not candidates:
+                return set()
+        return {row for row in candidates if self.row_contains(row, text)}
+
+    def row_contains(self, row, text):
+        if text in self.skus[row].lower():
+            return True
+        return any(text in part.lower() for part in self.lines[row].components)
+
+    def filter_rows(self, text="", status=None):
+        """
+        Sorted rows matching text and a status filter: "Received", "Pending",
+        "Wrong Part", or None for all the rows.
+        """
+        rows = self.matching_rows(text)
+        if status == "Received":
+            rows &= self.received_rows
+        elif status == "Pending":
+            rows -= self.ready_rows
+        elif status is not None:
+            rows &= self.rows_by_status[status]
+        return sorted(rows)
@@ -0,0 +1,190 @@
+import functools
+import random
+import re
+import threading
+import time
+
+import pyodbc
+
+# SQLSTATEs of errors that can succeed if the statement is run again
+TRANSIENT_SQLSTATES = {
+    "08001",  # Unable to connect
+    "08S01",  # Communication link failure
+    "08007",  # Connection failure during transaction
+    "HYT00",  # Timeout expired
+    "HYT01",  # Connection timeout expired
+    "40001",  # Deadlock victim
+}
+
+# SQL Server / Azure SQL error numbers of transient errors
+TRANSIENT_ERROR_NUMBERS = {
+    -2,  # Timeout
+    64,  # Connection reset
+    233,  # Connection closed by the server
+    1205,  # Deadlock victim
+    4060,  # Database unavailable
+    10053,  # Connection aborted
+    10054,  # Connection reset by peer
+    10060,  # Connection timed out
+    10928,  # Resource limit reached
+    10929,  # Resource limit reached
+    40197,  # Service error processing the request
+    40501,  # Service busy
+    40613,  # Database unavailable
+    49918,  # Not enough resources
+    49919,  # Too many operations in progress
+    49920,  # Service busy
+}
+
+ERROR_NUMBER = re.compile(r"\((-?\d+)\)")
+
+
+class DatabaseUnavailable(Exception):
+    """The database can't be reached now, the operation was not done."""
+
+
+class QueryCancelled(Exception):
+    """The operation was cancelled with ExampleDb.cancel."""
+
+
+class CancelToken:
+    """
+    Cancels the one ExampleDb operation it is passed to, with ExampleDb.cancel,
+    whether it is running or still waiting for the connection.
+    """
+
+    def __init__(self):
+        self.cancelled = False
+
+
+def is_transient(error):
+    """Check if a pyodbc error is worth retrying."""
+    if not error.args:
+        return False
+    sqlstate = str(error.args[0])
+    if sqlstate in TRANSIENT_SQLSTATES:
+        return True
+    message = str(error.args[-1])
+    return any(
+        int(number) in TRANSIENT_ERROR_NUMBERS
+        for number in ERROR_NUMBER.findall(message)
+    )
+
+
+def backoff_delay(attempt, base_delay, max_delay):
+    """Exponential backoff with full jitter, so stations don't retry in step."""
+    return random.uniform(0, min(max_delay, base_delay * 2**attempt))
+
+
+class CircuitBreaker:
+    """
+    Stops calls to the database after repeated transient failures.
+    While open, calls fail right away with DatabaseUnavailable. After reset_timeout
+    seconds one call is let through, and its result closes or reopens the circuit.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def is_open(self):
+        with self.lock:
+            return self.opened_at is not None and not self.retry_due()
+
+    def retry_due(self):
+        return time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def allow(self):
+        """Raise DatabaseUnavailable if calls are blocked."""
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if not self.retry_due():
+                remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+                raise DatabaseUnavailable(
+                    f"Database unavailable, retrying in {remaining:.0f}s."
+                )
+            # Let this call through as a trial, blocking the others meanwhile
+            self.opened_at = time.monotonic()
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+def resilient(idempotent, read_only=False):
+    """
+    Run an ExampleDb operation through the circuit breaker of its endpoint.
+    read_only operations are sent to the read replica when one is configured.
+    It is either True or a function of the operation's arguments, returning False
+    when the operation has to see this station's latest writes on the primary.
+    Transient errors of idempotent operations are retried with jittered backoff on a
+    new connection. Writes are rolled back and not retried, since a lost commit
+    acknowledgement can't be told apart from a failed commit.
+    Transient errors that are not recovered are raised as DatabaseUnavailable.
+    Operations hold the connection lock, so threads take turns on the connection.
+    An operation given a cancel_token raises QueryCancelled once ExampleDb.cancel is
+    called with it, also if that happened while it was waiting for the lock.
+    Operations run by another operation share its token.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, cancel_token=None, **kwargs):
+            with self.lock:
+                outer_token = self.cancel_token
+                self.start_operation(cancel_token or outer_token or CancelToken())
+                try:
+                    self.check_cancelled()
+                    return run(self, *args, **kwargs)
+                finally:
+                    self.start_operation(outer_token)
+
+        def run(self, *args, **kwargs):
+            settings = self.resilience
+            attempts = settings["attempts"] if idempotent else 1
+            replica = (
+                read_only(self, *args, **kwargs) if callable(read_only) else read_only
+            )
+            for attempt in range(attempts):
+                # Routed on every attempt, so a failed replica falls back to the primary
+                self.endpoint = self.route(replica)
+                self.breaker.allow()
+                try:
+                    if self.cursor is None:
+                        self.connect()
+                    result = func(self, *args, **kwargs)
+                except pyodbc.Error as e:
+                    if self.cancel_token.cancelled:
+                        raise QueryCancelled() from e
+                    if not is_transient(e):
+                        raise
+                    self.breaker.record_failure()
+                    self.discard_connection()
+                    if attempt + 1 == attempts:
+                        raise DatabaseUnavailable(
+                            f"Database unavailable: {e.args[-1]}"
+                        ) from e
+                    time.sleep(
+                        backoff_delay(
+                            attempt, settings["base_delay"], settings["max_delay"]
+                        )
+                    )
+                else:
+                    self.breaker.record_success()
+                    return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,163 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+def copy_lines(lines):
+    """Copy cached return lines so the UI can edit them without touching the cache."""
+    return [line.copy() for line in lines]
+
+
+class ExpectedArrivalsCache:
+    """
+    In-memory copy of the returns that are not received yet, keyed by tracking
+    number, so scans of expected boxes are answered without a database round trip.
+    Loaded in bulk by ExampleDb.preload_expected_arrivals, entries are dropped as
+    their returns are checked in.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()  # Loaded from a background thread
+        self.entries = {}  # Tracking number -> return lines
+        self.tracking_numbers = {}  # Return id number -> tracking numbers
+        self.hits = 0
+        self.misses = 0
+        self.loaded_at = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def load(self, entries, loaded_at=None):
+        """Replace the cached returns with a dict of tracking number -> return lines."""
+        tracking_numbers = {}
+        for tracking_number, lines in entries.items():
+            for line in lines:
+                tracking_numbers.setdefault(line.return_id_number, set()).add(
+                    tracking_number
+                )
+
+        with self.lock:
+            self.entries = entries
+            self.tracking_numbers = tracking_numbers
+            self.loaded_at = loaded_at or time.time()
+
+    def get(self, tracking_number):
+        """Return a copy of the cached return lines, or None on a miss."""
+        with self.lock:
+            lines = self.entries.get(tracking_number)
+            if lines is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return copy_lines(lines)
+
+    def invalidate(self, tracking_number):
+        """
+        Drop a tracking number, and every tracking number of the same returns since
+        their received counts change with it.
+        """
+        with self.lock:
+            lines = self.entries.pop(tracking_number, None)
+            if not lines:
+                return
+            for return_id_number in {line.return_id_number for line in lines}:
+                for other in self.tracking_numbers.pop(return_id_number, ()):
+                    self.entries.pop(other, None)
+
+    def export(self):
+        """Return the cached returns as (dict of tracking number -> lines, loaded at)."""
+        with self.lock:
+            return dict(self.entries), self.loaded_at
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "loaded_at": self.loaded_at,
+            }
+
+
+class ResultCache:
+    """
+    Bounded LRU cache of recent results with a staleness bound.
+    Entries older than ttl seconds are treated as misses, and the least recently
+    used entry is evicted once maxsize entries are cached.
+    """
+
+    def __init__(self, maxsize=256, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # Key -> (time cached, value)
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Return the cached value, or None on a miss."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            cached_at, value = entry
+            if time.monotonic() - cached_at > self.ttl:
+                del self.entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, age=0):
+        """Cache a value, age is how many seconds old it already is."""
+        if age > self.ttl:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() - age, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evicted += 1
+
+    def pop(self, key):
+        """Remove an entry, returning its value or None."""
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            return None if entry is None else entry[1]
+
+    def invalidate_if(self, predicate):
+        """Remove every entry whose value matches the predicate."""
+        with self.lock:
+            for key in [k for k, (_, v) in self.entries.items() if predicate(v)]:
+                del self.entries[key]
+
+    def export(self):
+        """Return the cached entries as (key, age in seconds, value), oldest first."""
+        now = time.monotonic()
+        with self.lock:
+            return [
+                (key, now - cached_at, value)
+                for key, (cached_at, value) in self.entries.items()
+            ]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
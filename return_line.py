@@ -0,0 +1,99 @@
+class ReturnLine:
+    """One SKU of a return, as fetched from the database and edited in the UI."""
+
+    __slots__ = (
+        "sku",
+        "return_id_number",
+        "expected_sku_amount",
+        "sku_amount_received",
+        "status",
+        "note",
+        "received",
+        "components",
+        "wrong_parts",
+        "wrong_sku",
+        "id",
+        "row_version",
+    )
+
+    def __init__(
+        self,
+        sku,
+        return_id_number,
+        expected_sku_amount=0,
+        sku_amount_received=0,
+        status="Select Status",
+        note="",
+        received=False,
+        components=None,
+        wrong_parts=None,
+        wrong_sku="",
+        id=None,
+        row_version=None,
+    ):
+        self.sku = sku  # "sku@po"
+        self.return_id_number = return_id_number
+        self.expected_sku_amount = expected_sku_amount
+        self.sku_amount_received = sku_amount_received
+        self.status = status
+        self.note = note
+        self.received = received
+        self.components = components if components is not None else {}
+        self.wrong_parts = wrong_parts if wrong_parts is not None else {}
+        self.wrong_sku = wrong_sku  # SKU verified as received for a "Wrong Part"
+        self.id = id  # Returns row id
+        self.row_version = row_version  # Version of the Returns row when it was read
+
+    def __repr__(self):
+        return f"ReturnLine({self.sku!r}, {self.return_id_number!r}, {self.status!r})"
+
+    def copy(self):
+        """Copy the line, including its component dicts."""
+        return ReturnLine(
+            self.sku,
+            self.return_id_number,
+            self.expected_sku_amount,
+            self.sku_amount_received,
+            self.status,
+            self.note,
+            self.received,
+            dict(self.components),
+            dict(self.wrong_parts),
+            self.wrong_sku,
+            self.id,
+            self.row_version,
+        )
+
+    def to_row(self):
+        """The line as a plain list, in the order of the constructor arguments."""
+        return [getattr(self, name) for name in self.__slots__]
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row)
+
+    @property
+    def clean_sku(self):
+        """The SKU without its PO."""
+        return self.sku.split("@")[0]
+
+    @property
+    def po(self):
+        return self.sku.split("@")[1]
+
+    @property
+    def parts(self):
+        """
+        The parts being checked in: the parts of the wrong SKU that was received
+        for a "Wrong Part" return, the expected components otherwise.
+        """
+        if self.status == "Wrong Part":
+            return self.wrong_parts
+        return self.components
+
+    @parts.setter
+    def parts(self, parts):
+        if self.status == "Wrong Part":
+            self.wrong_parts = parts
+        else:
+            self.components = parts
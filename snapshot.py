@@ -0,0 +1,49 @@
+import json
+import mmap
+import os
+import time
+
+SNAPSHOT_VERSION = 2  # Bumped when the saved caches change shape
+DEFAULT_FILENAME = ".returns_check_in_snapshot.json"
+
+
+def snapshot_path(snapshot_config):
+    """The snapshot file of the station, in the home folder unless configured."""
+    return snapshot_config["path"] or os.path.join(
+        os.path.expanduser("~"), DEFAULT_FILENAME
+    )
+
+
+def save_snapshot(path, caches):
+    """
+    Write the station caches to a compact JSON file. The file is replaced in one
+    step, so a crash while saving leaves the previous snapshot intact.
+    """
+    data = {"version": SNAPSHOT_VERSION, "saved_at": time.time(), **caches}
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(data, file, separators=(",", ":"))
+    os.replace(temp_path, path)
+
+
+def load_snapshot(path):
+    """
+    Read a snapshot written by save_snapshot. The file is memory-mapped, so it is
+    parsed from the page cache with a single copy instead of buffered reads.
+    Returns None if there is no usable snapshot.
+    """
+    try:
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                data = json.loads(mapped[:])
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable snapshot {path}: {e}")
+        return None
+
+    if data.get("version") != SNAPSHOT_VERSION:
+        return None
+    return data
@@ -0,0 +1,41 @@
+import time
+
+
+class StartupTimer:
+    """
+    Measures the phases of the application startup and prints a breakdown, to see
+    how long it takes until the window is ready for the first scan.
+    """
+
+    def __init__(self, start=None):
+        self.start = start if start is not None else time.perf_counter()
+        self.last = self.start
+        self.phases = []  # (phase, seconds) in the order they finished
+        self.background = []  # (phase, seconds) of work done off the main thread
+        self.ready_at = None
+
+    def mark(self, phase):
+        """Record the time since the previous mark as the duration of a phase."""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def ready(self):
+        """Record that the window can take scans."""
+        self.mark("first paint")
+        self.ready_at = self.last - self.start
+
+    def record(self, phase, seconds):
+        """Record a phase that ran in the background."""
+        self.background.append((phase, seconds))
+
+    def report(self):
+        lines = ["Startup timing:"]
+        lines += [f"  {phase:<32}{seconds:7.3f}s" for phase, seconds in self.phases]
+        if self.ready_at is not None:
+            lines.append(f"  {'ready to scan':<32}{self.ready_at:7.3f}s")
+        lines += [
+            f"  {phase + ' (background)':<32}{seconds:7.3f}s"
+            for phase, seconds in self.background
+        ]
+        print("\n".join(lines))
@@ -0,0 +1,241 @@
+class Statement:
+    """
+    A named SQL statement of ExampleDb. Every statement runs on a cursor of its own,
+    so pyodbc prepares it once per connection and reuses it on the next executions.
+    Statements with an IN list have a {} placeholder filled in by select_in.
+    Guarded writes only match the row version that was read, and output the new one.
+    """
+
+    __slots__ = ("name", "sql")
+
+    def __init__(self, name, sql):
+        self.name = name
+        self.sql = sql
+
+    def __repr__(self):
+        return f"Statement({self.name!r})"
+
+
+STATEMENTS = {}  # Name -> statement
+
+
+def statement(name, sql):
+    """Register a statement under a unique name."""
+    if name in STATEMENTS:
+        raise ValueError(f"Statement {name!r} is already registered")
+    STATEMENTS[name] = Statement(name, sql)
+    return STATEMENTS[name]
+
+
+# Pallet notes ------------------------------------------------------------------
+
+GET_PALLET_NOTE = statement(
+    "get_pallet_note",
+    """
+    SELECT pallet_note, CAST(row_version AS bigint) AS row_version
+    FROM ReturnPalletNotes WHERE tracking_number = ?
+    """,
+)
+
+UPSERT_PALLET_NOTE = statement(
+    "upsert_pallet_note",
+    """
+    MERGE ReturnPalletNotes WITH (HOLDLOCK) AS target
+    USING (
+        SELECT ? AS tracking_number, ? AS pallet_note, CAST(? AS bigint) AS row_version
+    ) AS source
+    ON target.tracking_number = source.tracking_number
+    WHEN MATCHED AND CAST(target.row_version AS bigint) = source.row_version THEN
+        UPDATE SET pallet_note = source.pallet_note
+    WHEN NOT MATCHED THEN
+        INSERT (tracking_number, pallet_note)
+        VALUES (source.tracking_number, source.pallet_note)
+    OUTPUT CAST(inserted.row_version AS bigint) AS row_version;
+    """,
+)
+
+# Searches ----------------------------------------------------------------------
+
+SEARCH_RETURNS = statement(
+    "search_returns",
+    """
+    SELECT r.id, r.return_id_number, r.sku, r.po, r.received, r.status, r.note,
+    CAST(r.row_version AS bigint) AS row_version, n.pallet_note,
+    CAST(n.row_version AS bigint) AS pallet_note_version
+    FROM Returns r
+    LEFT JOIN ReturnPalletNotes n ON n.tracking_number = r.tracking_number
+    WHERE r.tracking_number = ?
+    """,
+)
+
+GET_COMPONENTS = statement(
+    "get_components",
+    """
+    SELECT parts, condition FROM ReturnItems
+    WHERE return_id = ?
+    """,
+)
+
+GET_WRONG_PARTS = statement(
+    "get_wrong_parts",
+    """
+    SELECT parts, condition FROM ReturnWrongItemsReceived
+    WHERE return_id = ?
+    """,
+)
+
+# Bulk searches -----------------------------------------------------------------
+
+GET_COMPONENTS_BULK = statement(
+    "get_components_bulk",
+    """
+    SELECT return_id, parts, condition FROM ReturnItems
+    WHERE return_id IN ({})
+    """,
+)
+
+GET_CHECKLIST_RETURNS = statement(
+    "get_checklist_returns",
+    """
+    SELECT id, tracking_number, return_id_number, sku, po FROM Returns
+    WHERE tracking_number IN ({})
+    ORDER BY id
+    """,
+)
+
+GET_WRONG_PARTS_BULK = statement(
+    "get_wrong_parts_bulk",
+    """
+    SELECT return_id, parts, condition FROM ReturnWrongItemsReceived
+    WHERE return_id IN ({})
+    """,
+)
+
+COUNT_SKUS_BULK = statement(
+    "count_skus_bulk",
+    """
+    SELECT return_id_number, count(*) AS expected,
+    sum(CASE WHEN received = 1 THEN 1 ELSE 0 END) AS received
+    FROM Returns
+    WHERE return_id_number IN ({})
+    GROUP BY return_id_number
+    """,
+)
+
+SEARCH_RETURNS_BULK = statement(
+    "search_returns_bulk",
+    """
+    SELECT r.id, r.tracking_number, r.return_id_number, r.sku, r.po, r.received,
+    r.status, r.note, CAST(r.row_version AS bigint) AS row_version, n.pallet_note,
+    CAST(n.row_version AS bigint) AS pallet_note_version
+    FROM Returns r
+    LEFT JOIN ReturnPalletNotes n ON n.tracking_number = r.tracking_number
+    WHERE r.tracking_number IN ({})
+    ORDER BY r.id
+    """,
+)
+
+PRELOAD_EXPECTED_ARRIVALS = statement(
+    "preload_expected_arrivals",
+    """
+    SELECT r.id, r.tracking_number, r.return_id_number, r.sku, r.po, r.received,
+    r.status, r.note, CAST(r.row_version AS bigint) AS row_version, n.pallet_note,
+    CAST(n.row_version AS bigint) AS pallet_note_version
+    FROM Returns r
+    LEFT JOIN ReturnPalletNotes n ON n.tracking_number = r.tracking_number
+    WHERE r.tracking_number IN (
+        SELECT TOP (?) tracking_number FROM Returns WHERE received = 0
+        GROUP BY tracking_number
+        ORDER BY max(id) DESC
+    )
+    ORDER BY r.id
+    """,
+)
+
+# Row versions below it belong to committed writes only, those at or above it may
+# still be assigned to transactions that are open
+GET_ACTIVE_ROW_VERSION = statement(
+    "get_active_row_version",
+    "SELECT CAST(MIN_ACTIVE_ROWVERSION() AS bigint) AS row_version",
+)
+
+GET_CHANGED_RETURNS = statement(
+    "get_changed_returns",
+    """
+    SELECT id, tracking_number, return_id_number, sku, po, received, status, note,
+    CAST(row_version AS bigint) AS row_version
+    FROM Returns
+    WHERE tracking_number = ?
+    AND CAST(row_version AS bigint) > ? AND CAST(row_version AS bigint) < ?
+    ORDER BY id
+    """,
+)
+
+# Check in ----------------------------------------------------------------------
+
+CHECK_IN_RETURN = statement(
+    "check_in_return",
+    """
+    UPDATE Returns SET received = 1, received_date= ?, status = ?, note = ?, checkin_station = ?
+    OUTPUT CAST(inserted.row_version AS bigint) AS row_version
+    WHERE tracking_number = ? AND sku = ? AND po = ? AND CAST(row_version AS bigint) = ?
+    """,
+)
+
+INSERT_WRONG_PARTS = statement(
+    "insert_wrong_parts",
+    """
+    INSERT INTO ReturnWrongItemsReceived (return_id, parts, condition) VALUES ((SELECT id FROM Returns WHERE tracking_number = ? AND sku = ? AND po = ?), ?, ?)
+    """,
+)
+
+UPDATE_COMPONENTS = statement(
+    "update_components",
+    """
+    UPDATE ReturnItems SET condition = ? WHERE return_id = (SELECT id FROM Returns WHERE tracking_number = ? AND  sku = ? AND po= ?) AND parts = ?
+    """,
+)
+
+UNDO_CHECK_IN = statement(
+    "undo_check_in",
+    """
+    UPDATE Returns SET received = 0, received_date = NULL, status = ?, note = ?, checkin_station = NULL
+    OUTPUT CAST(inserted.row_version AS bigint) AS row_version
+    WHERE tracking_number = ? AND sku = ? AND po = ? AND CAST(row_version AS bigint) = ?
+    """,
+)
+
+GET_STATUS = statement(
+    "get_status",
+    """
+    SELECT status FROM Returns WHERE tracking_number = ? AND sku = ? AND po = ?
+    """,
+)
+
+DELETE_WRONG_PARTS = statement(
+    "delete_wrong_parts",
+    """
+    DELETE FROM ReturnWrongItemsReceived WHERE return_id = (SELECT id FROM Returns WHERE tracking_number = ? AND sku = ? AND po = ?)
+    """,
+)
+
+# Product catalog ---------------------------------------------------------------
+
+VERIFY_SKU = statement(
+    "verify_sku",
+    """
+    SELECT component FROM components WHERE sku = ?
+    """,
+)
+
+GET_SKU_COMPONENTS = statement(
+    "get_sku_components",
+    """
+    SELECT sku, component FROM components
+    """,
+)
+
+GET_SKU_COMPONENT_MAP = statement(
+    "get_sku_component_map",
+    "select * from vProductAndAliasWithComponentsView",
+)
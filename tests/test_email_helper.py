@@ -0,0 +1,150 @@
+import email
+import socket
+import time
+
+import pytest
+
+from email_helper import ErrorOutbox
+
+controller = pytest.importorskip("aiosmtpd.controller")
+
+
+class Inbox:
+    """Handler of the local SMTP stand-in, keeps the messages it receives."""
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(email.message_from_bytes(envelope.content))
+        return "250 OK"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out")
+        time.sleep(0.02)
+
+
+def start_smtp(port):
+    inbox = Inbox()
+    server = controller.Controller(inbox, hostname="127.0.0.1", port=port)
+    server.start()
+    return server, inbox
+
+
+@pytest.fixture
+def port():
+    return free_port()
+
+
+@pytest.fixture
+def smtp(port):
+    server, inbox = start_smtp(port)
+    yield inbox
+    server.stop()
+
+
+def make_outbox(port, min_interval=0.5, dedupe_window=3600):
+    outbox = ErrorOutbox(
+        {
+            "host": "127.0.0.1",
+            "port": port,
+            "use_ssl": False,
+            "login": False,
+            "timeout": 5,
+        },
+        min_interval=min_interval,
+        dedupe_window=dedupe_window,
+    )
+    outbox.start()
+    return outbox
+
+
+def body(message):
+    return message.get_payload(decode=True).decode().replace("\r\n", "\n")
+
+
+def test_identical_reports_are_merged(port, smtp):
+    outbox = make_outbox(port, min_interval=60)
+    # Queued before the thread can send, so they all go in the first digest
+    with outbox.condition:
+        for _ in range(5):
+            outbox.report("Unexpected Error", "Traceback A")
+        outbox.report("Unexpected Error", "Traceback B")
+
+    wait_for(lambda: len(smtp.messages) == 1)
+    outbox.stop()
+
+    assert smtp.messages[0]["Subject"].startswith("Error digest (6 errors)")
+    assert "Unexpected Error (x5):\nTraceback A" in body(smtp.messages[0])
+    assert "Unexpected Error:\nTraceback B" in body(smtp.messages[0])
+
+
+def test_digests_are_rate_limited(port, smtp):
+    outbox = make_outbox(port, min_interval=1)
+    outbox.report("First", "Traceback A")
+    wait_for(lambda: len(smtp.messages) == 1)
+    sent_at = time.monotonic()
+
+    for _ in range(10):
+        outbox.report("Second", "Traceback B")
+    time.sleep(0.5)
+    assert len(smtp.messages) == 1
+
+    wait_for(lambda: len(smtp.messages) == 2)
+    assert time.monotonic() - sent_at >= 0.9
+    assert "Second (x10):\nTraceback B" in body(smtp.messages[1])
+    outbox.stop()
+
+
+def test_reports_already_sent_are_only_counted(port, smtp):
+    outbox = make_outbox(port, min_interval=0.2)
+    outbox.report("Unexpected Error", "Traceback A")
+    wait_for(lambda: len(smtp.messages) == 1)
+
+    outbox.report("Unexpected Error", "Traceback A")
+    outbox.report("Unexpected Error", "Traceback A")
+    wait_for(lambda: len(smtp.messages) == 2)
+    outbox.stop()
+
+    assert "Traceback A" not in body(smtp.messages[1])
+    assert "(x2): same error as already reported." in body(smtp.messages[1])
+
+
+def test_pending_reports_are_flushed_on_stop(port, smtp):
+    outbox = make_outbox(port, min_interval=60)
+    outbox.report("First", "Traceback A")
+    wait_for(lambda: len(smtp.messages) == 1)
+
+    outbox.report("Second", "Traceback B")
+    outbox.stop()
+
+    assert len(smtp.messages) == 2
+    assert "Traceback B" in body(smtp.messages[1])
+
+
+def test_reports_are_kept_while_smtp_is_down(port):
+    outbox = make_outbox(port, min_interval=0.5)
+    outbox.report("Unexpected Error", "Traceback A")
+    outbox.report("Unexpected Error", "Traceback A")
+    # The first digest fails and is put back to be sent with the next one
+    wait_for(lambda: outbox.last_sent is not None and outbox.pending)
+    outbox.report("Unexpected Error", "Traceback A")
+
+    server, inbox = start_smtp(port)
+    try:
+        wait_for(lambda: len(inbox.messages) == 1)
+        outbox.stop()
+    finally:
+        server.stop()
+
+    assert "Unexpected Error (x3):\nTraceback A" in body(inbox.messages[0])
@@ -0,0 +1,177 @@
+import re
+
+import pytest
+
+# Skipped where pyodbc or the ODBC driver manager it loads is not installed
+pyodbc = pytest.importorskip("pyodbc", exc_type=ImportError)
+
+import example_db  # noqa: E402
+from example_db import PRIMARY, REPLICA, ExampleDb  # noqa: E402
+
+
+class FakeRow:
+    def __init__(self, **values):
+        self.__dict__.update(values)
+
+    def __getitem__(self, index):
+        return list(self.__dict__.values())[index]
+
+
+class FakeCursor:
+    """Cursor of a stand-in database, logging the statements it runs."""
+
+    def __init__(self, server, log):
+        self.server = server
+        self.log = log
+        self.rows = []
+        self.fast_executemany = False
+
+    def execute(self, sql, *params):
+        self.log.append((self.server, " ".join(sql.split())))
+        # Guarded writes output the new row version, reads find nothing
+        self.rows = [FakeRow(row_version=2)] if "OUTPUT" in sql else []
+        return self
+
+    def executemany(self, sql, rows):
+        self.log.append((self.server, " ".join(sql.split())))
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def cancel(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, server, log):
+        self.server = server
+        self.log = log
+        self.timeout = 0
+
+    def cursor(self):
+        return FakeCursor(self.server, self.log)
+
+    def commit(self):
+        self.log.append((self.server, "COMMIT"))
+
+    def rollback(self):
+        self.log.append((self.server, "ROLLBACK"))
+
+    def close(self):
+        pass
+
+
+class StandIns:
+    """Connection factory of a primary and a replica stand-in database."""
+
+    def __init__(self):
+        self.log = []  # (server, statement) in the order they ran
+        self.down = set()  # Servers refusing connections
+
+    def connect(self, connection_string, timeout=None):
+        server = re.search(r"SERVER=([^;]+)", connection_string).group(1)
+        if server in self.down:
+            raise pyodbc.OperationalError("08001", "[08001] Unable to connect")
+        return FakeConnection(server, self.log)
+
+    def servers(self):
+        """The servers that ran statements since the last call."""
+        servers = {server for server, _ in self.log}
+        self.log.clear()
+        return servers
+
+
+def endpoint(server):
+    return {
+        "driver": "{Stand-in}",
+        "server": server,
+        "port": 1433,
+        "database": "Returns",
+        "username": "user",
+        "password": "password",
+    }
+
+
+@pytest.fixture
+def stand_ins(monkeypatch):
+    stand_ins = StandIns()
+    monkeypatch.setattr(example_db.pyodbc, "connect", stand_ins.connect)
+    return stand_ins
+
+
+@pytest.fixture
+def db(stand_ins):
+    db = ExampleDb()
+    db.endpoints = {PRIMARY: endpoint("primary"), REPLICA: endpoint("replica")}
+    db.resilience = {**db.resilience, "base_delay": 0, "max_delay": 0}
+    return db
+
+
+def check_in(db, tracking_number):
+    return db.check_in_return(
+        tracking_number, "Complete", "", "SKU1@PO1", {"SKU1-A": "Good"}, 1
+    )
+
+
+def test_reads_go_to_the_replica(db, stand_ins):
+    db.search_tracking_number("1Z1")
+    assert stand_ins.servers() == {"replica"}
+
+    db.verify_sku("SKU1")
+    assert stand_ins.servers() == {"replica"}
+
+    db.search_tracking_numbers(["1Z1", "1Z2"])
+    assert stand_ins.servers() == {"replica"}
+
+
+def test_writes_go_to_the_primary(db, stand_ins):
+    assert check_in(db, "1Z1") == 2
+    assert ("primary", "COMMIT") in stand_ins.log
+    assert stand_ins.servers() == {"primary"}
+
+
+def test_checked_in_returns_are_read_from_the_primary(db, stand_ins):
+    check_in(db, "1Z1")
+    stand_ins.servers()
+
+    db.search_tracking_number("1z1")
+    assert stand_ins.servers() == {"primary"}
+
+    db.search_tracking_numbers(["1Z2", "1Z1"])
+    assert stand_ins.servers() == {"primary"}
+
+    db.search_tracking_number("1Z2")
+    assert stand_ins.servers() == {"replica"}
+
+
+def test_checked_in_returns_go_back_to_the_replica_after_the_window(db, stand_ins):
+    db.read_your_writes = 0
+    check_in(db, "1Z1")
+    stand_ins.servers()
+
+    db.search_tracking_number("1Z1")
+    assert stand_ins.servers() == {"replica"}
+
+
+def test_reads_fall_back_to_the_primary_when_the_replica_fails(db, stand_ins):
+    stand_ins.down.add("replica")
+
+    db.search_tracking_number("1Z1")
+    assert stand_ins.servers() == {"primary"}
+    assert db.breakers[REPLICA].is_open
+
+    # Not tried again until the breaker lets a call through
+    db.verify_sku("SKU1")
+    assert stand_ins.servers() == {"primary"}
+
+
+def test_everything_goes_to_the_primary_without_a_replica(db, stand_ins):
+    del db.endpoints[REPLICA]
+
+    db.search_tracking_number("1Z1")
+    check_in(db, "1Z2")
+    assert stand_ins.servers() == {"primary"}
@@ -0,0 +1,82 @@
+from return_line import ReturnLine
+from zpl_labels import SKU_LABEL_TEMPLATE, FileLabelSink, print_labels
+
+
+def read_labels(path):
+    """Split a label file into its ZPL jobs."""
+    return [label + "^XZ" for label in path.read_text().split("^XZ") if label]
+
+
+def test_pallet_labels_are_written_to_the_file_sink(tmp_path):
+    path = tmp_path / "labels.zpl"
+    pallet = [
+        ReturnLine("SKU1@PO1", "RMA1", components={"PART-A": "Good"}),
+        ReturnLine("SKU2@PO2", "RMA1", components={"PART-B": "Damaged"}),
+    ]
+
+    print_labels(FileLabelSink(path), "1Z999", pallet)
+
+    labels = read_labels(path)
+    assert len(labels) == 4
+    assert "^FDSKU1^FS" in labels[0]
+    assert "^FDRMA: RMA1^FS" in labels[0]
+    assert "^FD1Z999^FS" in labels[0]
+    assert "^FDPART-A^FS" in labels[1]
+    assert "^FDSKU: SKU1^FS" in labels[1]
+    assert "^FDGood - RMA: RMA1^FS" in labels[1]
+    assert "^FDDamaged - RMA: RMA1^FS" in labels[3]
+
+
+def test_jobs_are_appended_to_the_file(tmp_path):
+    path = tmp_path / "labels.zpl"
+    sink = FileLabelSink(path)
+
+    print_labels(sink, "1Z1", [ReturnLine("SKU1@PO1", "RMA1")])
+    print_labels(sink, "1Z2", [ReturnLine("SKU2@PO2", "RMA2")])
+
+    assert len(read_labels(path)) == 2
+
+
+def test_control_characters_are_hex_escaped(tmp_path):
+    path = tmp_path / "labels.zpl"
+    line = ReturnLine("A^B_C~D@PO1", "RMA_1", components={"P^1": "Good"})
+
+    print_labels(FileLabelSink(path), "1Z~1", [line])
+
+    sku_label, component_label = read_labels(path)
+    assert "^FH^FDA_5EB_5FC_7ED^FS" in sku_label
+    assert "^FH^FDRMA: RMA_5F1^FS" in sku_label
+    assert "^FH^FD1Z_7E1^FS" in sku_label
+    assert "^FH^FDP_5E1^FS" in component_label
+    # Only the template's own commands are left unescaped
+    assert sku_label.count("^") == SKU_LABEL_TEMPLATE.count("^")
+
+
+def test_missing_components_get_no_label(tmp_path):
+    path = tmp_path / "labels.zpl"
+    line = ReturnLine(
+        "SKU1@PO1", "RMA1", components={"PART-A": "Good", "PART-B": "Missing"}
+    )
+
+    print_labels(FileLabelSink(path), "1Z1", [line])
+
+    labels = read_labels(path)
+    assert len(labels) == 2
+    assert not any("PART-B" in label for label in labels)
+
+
+def test_wrong_parts_are_labelled_for_a_wrong_part_return(tmp_path):
+    path = tmp_path / "labels.zpl"
+    line = ReturnLine(
+        "SKU1@PO1",
+        "RMA1",
+        status="Wrong Part",
+        components={"PART-A": "Good"},
+        wrong_parts={"OTHER-A": "Good"},
+    )
+
+    print_labels(FileLabelSink(path), "1Z1", [line])
+
+    labels = read_labels(path)
+    assert len(labels) == 2
+    assert "^FDOTHER-A^FS" in labels[1]
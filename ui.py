@@ -12,16 +12,29 @@ from PyQt5.QtWidgets import (
     QToolTip,
     QDesktopWidget,
     QTextEdit,
-    QScrollArea,
     QDialog,
+    QCheckBox,
+    QTableWidget,
+    QTableWidgetItem,
+    QHeaderView,
+    QAbstractItemView,
 )
 from PyQt5.QtGui import QFont, QIcon, QTextCursor
 from PyQt5.QtCore import Qt, pyqtSignal, QTimer
-from example_db import ReturnsDb
+from example_db import ExampleDb, WriteConflict
+from resilience import CancelToken, DatabaseUnavailable
 import os
 import sys
 from label_updater import LabelUpdater
-from pallet_form import generate_and_print_pdf
+from edit_buffer import EditBuffer
+from pallet_list import PalletListModel, PalletListView
+from pallet_session import PalletSession
+from component_table import ComponentTableModel, ComponentTableView
+from config import LABEL_PRINTER, SNAPSHOT, DB_TIMEOUTS, PALLET_POLLING
+from snapshot import snapshot_path, load_snapshot, save_snapshot
+import time
+
+UNDO_WINDOW_MS = 10000  # How long a rapid mode check in can be undone
 
 
 def resource_path(relative_path):
@@ -30,6 +43,66 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 
+def clean_tracking_number(tracking_number):
+    """Normalize a scanned tracking number, shortening long FedEx barcodes."""
+    tracking_number = tracking_number.upper().replace(" ", "").strip()
+
+    # Remove any non-digit characters
+    cleaned_number = "".join(filter(str.isdigit, tracking_number))
+
+    if len(cleaned_number) > 30:
+        return cleaned_number[-12:]
+    return tracking_number
+
+
+def update_widget(widget, value, getter="text", setter="setText"):
+    """
+    Writes a value to a widget only if it differs from the displayed one, with the
+    widget's signals blocked so the programmatic update doesn't re-fire handlers.
+    """
+    if getattr(widget, getter)() != value:
+        blocked = widget.blockSignals(True)
+        getattr(widget, setter)(value)
+        widget.blockSignals(blocked)
+
+
+def check_in_error(line, sku_verified):
+    """
+    Validates a return line that has a status selected.
+    Returns the message to show the user, or None if it can be checked in.
+    """
+    conditions = list(line.parts.values())
+
+    # Making sure the SKU is not empty if the status is "Wrong Part"
+    if line.status == "Wrong Part" and not line.sku:
+        return "Please enter a SKU."
+    # Making sure the SKU has been verified if the status is "Wrong Part"
+    if line.status == "Wrong Part" and not sku_verified:
+        return "Please click search to verify SKU."
+    # Making sure if status is incomplete, there are no missing parts
+    if line.status == "Incomplete" and "Missing" not in conditions:
+        return "Can't be Incomplete. There are no missing parts."
+    if line.status == "Complete" and "Missing" in conditions:
+        return "Can't be Complete. There are missing parts."
+    return None
+
+
+def rapid_check_in_error(line):
+    """
+    Validates a return line as it was loaded, before rapid mode checks it in as
+    Complete with every part Good.
+    Returns the message to show the user, or None if rapid mode can check it in.
+    """
+    if line.status in ("Wrong Part", "Wrong Product"):
+        return f"Marked {line.status}, please check it in by hand."
+    # Checking in deletes them, and the undo only restores the expected parts
+    if line.wrong_parts:
+        return "Has wrong parts recorded, please check it in by hand."
+    if any(c in ("Damaged", "Missing") for c in line.components.values()):
+        return "Has damaged or missing parts, please check it in by hand."
+    return None
+
+
 class PalletNoteDialog(QDialog):
     def __init__(self, initial_text="", parent=None):
         super().__init__(parent)
@@ -95,6 +168,182 @@ class PalletNoteDialog(QDialog):
         return self.text_edit.toPlainText()
 
 
+class BatchChecklistDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Batch Checklists")
+
+        # Create layout
+        layout = QVBoxLayout(self)
+
+        # Label
+        self.label = QLabel("Tracking Numbers (one per line)")
+        layout.addWidget(self.label)
+
+        # Scrollable text field for the scanned tracking numbers
+        self.text_edit = QTextEdit(self)
+        self.text_edit.setAcceptRichText(False)
+        layout.addWidget(self.text_edit)
+
+        # Buttons layout
+        button_layout = QHBoxLayout()
+
+        # Print button
+        self.print_button = QPushButton("Print")
+        self.print_button.clicked.connect(self.accept)
+        button_layout.addWidget(self.print_button)
+
+        # Cancel button
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.reject)
+        button_layout.addWidget(self.cancel_button)
+
+        layout.addLayout(button_layout)
+
+    def get_tracking_numbers(self):
+        """
+        Returns the cleaned, de-duplicated tracking numbers entered in the text edit.
+        """
+        tracking_numbers = []
+        for line in self.text_edit.toPlainText().splitlines():
+            tracking_number = clean_tracking_number(line)
+            if tracking_number and tracking_number not in tracking_numbers:
+                tracking_numbers.append(tracking_number)
+        return tracking_numbers
+
+
+def classify_return(results):
+    """Describe a searched tracking number as (kind, received state) for pre-staging."""
+    if not results:
+        return "Unknown", ""
+
+    kind = f"Pallet ({len(results)} SKUs)" if len(results) > 1 else "Single"
+    received = sum(1 for line in results if line.received)
+    if received == len(results):
+        return kind, "Received"
+    if received:
+        return kind, f"{received} of {len(results)} received"
+    return kind, "Not received"
+
+
+class PreStagingDialog(QDialog):
+    """
+    Looks up a stack of tracking numbers at once, showing which are pallets,
+    already received or unknown. Double clicking one opens it in the main window.
+    """
+
+    def __init__(self, search_task, cancel_job, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Pre-Staging")
+        self.resize(600, 500)
+        # Run in the background with the scans and a cancel token
+        self.search_task = search_task
+        self.cancel_job = cancel_job  # Cancels a job without waiting for it
+        self.search_job = None
+        self.search_token = None
+        self.selected_tracking_number = None
+
+        # Create layout
+        layout = QVBoxLayout(self)
+
+        # Label
+        self.label = QLabel("Tracking Numbers (one per line)")
+        layout.addWidget(self.label)
+
+        # Scrollable text field for the scanned tracking numbers
+        self.text_edit = QTextEdit(self)
+        self.text_edit.setAcceptRichText(False)
+        layout.addWidget(self.text_edit)
+
+        # Table of the looked up tracking numbers
+        self.table = QTableWidget(0, 3, self)
+        self.table.setHorizontalHeaderLabels(["Tracking Number", "Type", "Received"])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.cellDoubleClicked.connect(self.open_tracking_number)
+        layout.addWidget(self.table)
+
+        # Label for the lookup status
+        self.status_label = StatusLabel()
+        self.status_label.set_message(" ", "ok")
+        layout.addWidget(self.status_label)
+
+        # Buttons layout
+        button_layout = QHBoxLayout()
+
+        # Look up button
+        self.search_button = QPushButton("Look Up")
+        self.search_button.clicked.connect(self.search)
+        button_layout.addWidget(self.search_button)
+
+        # Close button
+        self.close_button = QPushButton("Close")
+        self.close_button.clicked.connect(self.reject)
+        button_layout.addWidget(self.close_button)
+
+        layout.addLayout(button_layout)
+
+    def get_tracking_numbers(self):
+        """
+        Returns the cleaned, de-duplicated tracking numbers entered in the text edit.
+        """
+        tracking_numbers = []
+        for line in self.text_edit.toPlainText().splitlines():
+            tracking_number = clean_tracking_number(line)
+            if tracking_number and tracking_number not in tracking_numbers:
+                tracking_numbers.append(tracking_number)
+        return tracking_numbers
+
+    def search(self):
+        tracking_numbers = self.get_tracking_numbers()
+        if not tracking_numbers:
+            return
+
+        self.search_button.setDisabled(True)
+        self.status_label.set_message("Looking up...", "ok")
+        self.search_token = CancelToken()
+        self.search_job = LabelUpdater(
+            self.search_task, args=(tracking_numbers, self.search_token)
+        )
+        self.search_job.update_done.connect(self.show_results)
+        self.search_job.update_failed.connect(self.show_error)
+        self.search_job.start()
+
+    def show_results(self, found):
+        self.search_button.setDisabled(False)
+        self.table.setRowCount(len(found))
+        unknown = 0
+        for row, (tracking_number, results) in enumerate(found.items()):
+            kind, received = classify_return(results)
+            unknown += results is None
+            for column, text in enumerate((tracking_number, kind, received)):
+                self.table.setItem(row, column, QTableWidgetItem(text))
+
+        message = f"{len(found)} tracking numbers looked up"
+        if unknown:
+            self.status_label.set_message(f"{message}, {unknown} unknown.", "error")
+        else:
+            self.status_label.set_message(f"{message}.", "ok")
+
+    def show_error(self, error_message):
+        self.search_button.setDisabled(False)
+        self.status_label.set_message(f"Error: {error_message}", "error")
+
+    def open_tracking_number(self, row, column):
+        if self.table.item(row, 1).text() == "Unknown":
+            return
+        self.selected_tracking_number = self.table.item(row, 0).text()
+        self.accept()
+
+    def done(self, result):
+        # Closing doesn't wait for the lookup, it is cancelled and winds down alone
+        if self.search_job is not None and self.search_job.isRunning():
+            self.cancel_job(self.search_job, self.search_token)
+        super().done(result)
+
+
 class CustomLineEdit(QLineEdit):
     def keyPressEvent(self, event):
         # Check if the pressed key is the Group Separator (ASCII 29)
@@ -106,6 +355,22 @@ class CustomLineEdit(QLineEdit):
             super().keyPressEvent(event)
 
 
+class StatusLabel(QLabel):
+    """
+    Label whose text color comes from its "state" property ("ok" or "error"),
+    matched by the QLabel[state=...] rules of the application style sheet.
+    Changing the state re-polishes the already parsed style sheet, and setting a
+    message in the same state only repaints the text.
+    """
+
+    def set_message(self, text, state):
+        if self.property("state") != state:
+            self.setProperty("state", state)
+            self.style().unpolish(self)
+            self.style().polish(self)
+        self.setText(text)
+
+
 class ClickableLabel(QLabel):
     clicked = pyqtSignal(int)  # Signal to emit the index when the label is clicked
 
@@ -119,26 +384,50 @@ class ClickableLabel(QLabel):
 
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, startup_timer=None):
         super().__init__()
 
         # Global varibles
-        self.db = ReturnsDb()
+        self.db = ExampleDb()  # Connected in the background once the window is shown
+        self.startup_timer = startup_timer
+        self.connect_job = None
+        self.snapshot_job = None
+        self.snapshot_path = snapshot_path(SNAPSHOT)  # Loaded before connecting
+        self.snapshot_loaded = False  # Not saved over before it was loaded
         self.fields_min_height = 60
         self.tracking_font = QFont("Arial", 32, QFont.Bold)
         self.tracking_min_height = 90
         self.current_tracking_number_was_checked_in = False
-        self.do_not_update_state = False
         self.current_search_results = None
         self.originally_wrong_parts = False
         self.originally_wrong_product = False
         self.results = None
         self.current_result_index = 0
         self.current_tracking_number = None
-        self.sku_status_labels = {}
-        self.sku_selected_labels = {}
         self.is_pallet = False
+        self.pallet_session = None
         self.current_pallet_note = None
+        self.loaded_pallet_note = None  # The note as read, to merge with other stations
+        self.pallet_note_version = None
+        self.pallet_version = None  # Newest row version seen on the open pallet
+        self.pallet_reconciled_at = None
+        self.pallet_poll_job = None
+        self.label_print_jobs = []
+        self.edit_buffer = EditBuffer(self.apply_pending_edits, 300, self)
+        self.label_updater = None
+        self.search_generation = 0  # Results of older searches are ignored
+        self.search_job = None
+        self.search_token = None  # Cancels the database operation of the search
+        self.cancelled_jobs = []  # Kept until their thread ends
+        self.preload_job = None
+        self.rapid_check_in_job = None
+        self.last_rapid_check_in = None  # (tracking number, line, previous values)
+        # Left to be checked in by hand after an undo, until another box is scanned
+        self.undone_tracking_number = None
+
+        self.undo_timer = QTimer(self)
+        self.undo_timer.setSingleShot(True)
+        self.undo_timer.timeout.connect(self.expire_undo)
 
         self.setWindowIcon(QIcon(resource_path("RC.ico")))
         self.setWindowTitle("Returns Check-In V2.3")
@@ -154,18 +443,43 @@ class MainWindow(QMainWindow):
         header_layout.setSpacing(5)
 
         # Create a label for sucessful check-in
-        self.check_in_label = QLabel()
+        self.check_in_label = StatusLabel()
         # self.check_in_label.setMinimumHeight(self.check_in_label.fontMetrics().height())
-        self.check_in_label.setText(" ")
+        self.check_in_label.set_message(" ", "ok")  # Green text color
         self.check_in_label.setAlignment(Qt.AlignLeft)
-        check_in_label_color = "color: green"  # Green text color
-        self.check_in_label.setStyleSheet(check_in_label_color)
         header_layout.addWidget(self.check_in_label)
 
+        # Create a button to undo the last rapid mode check in
+        self.undo_button = QPushButton("Undo")
+        self.undo_button.clicked.connect(self.undo_rapid_check_in)
+        self.undo_button.setVisible(False)
+        header_layout.addWidget(self.undo_button)
+
+        # Create a checkbox to check in single boxes as soon as they are scanned
+        self.rapid_mode_checkbox = QCheckBox("Rapid Mode")
+        self.rapid_mode_checkbox.setToolTip(
+            "Check in single SKU returns as Complete with all parts Good when scanned."
+        )
+        header_layout.addWidget(self.rapid_mode_checkbox)
+
+        # Create a button to print the checklists of several pallets at once
+        self.batch_print_button = QPushButton("Batch Checklists")
+        self.batch_print_button.clicked.connect(self.print_batch_checklist)
+        header_layout.addWidget(self.batch_print_button)
+
+        # Create a button to look up a stack of tracking numbers before check in
+        self.pre_staging_button = QPushButton("Pre-Staging")
+        self.pre_staging_button.clicked.connect(self.open_pre_staging_dialog)
+        header_layout.addWidget(self.pre_staging_button)
+
+        # Create a button to load the returns expected today into memory
+        self.preload_button = QPushButton("Preload Arrivals")
+        self.preload_button.clicked.connect(self.preload_expected_arrivals)
+        header_layout.addWidget(self.preload_button)
+
         # Create a label for the database connection status
-        self.db_label = QLabel("Connected to Database")
-        db_label_color = "color: green"  # Green text color
-        self.db_label.setStyleSheet(db_label_color)
+        self.db_label = StatusLabel()
+        self.db_label.set_message("Connecting to Database...", "ok")  # Green text color
         self.db_label.setAlignment(Qt.AlignRight)
         header_layout.addWidget(self.db_label)
 
@@ -190,6 +504,7 @@ class MainWindow(QMainWindow):
         self.tracking_number_field.setMinimumHeight(self.tracking_min_height)
         self.tracking_number_field.setMinimumWidth(900)
         self.tracking_number_field.returnPressed.connect(self.search_tracking_number)
+        self.tracking_number_field.textChanged.connect(self.on_tracking_number_change)
         tracking_number_layout.addWidget(self.tracking_number_field)
 
         # Create a layout for the clear button
@@ -283,56 +598,12 @@ class MainWindow(QMainWindow):
         self.main_layout.addLayout(self.dropdown_layout)
 
         # Components section-------------------------------------------------
-        # SKU layout: container for SKU labels and dropdowns
-        self.sku_status_layout = QVBoxLayout()
-        # self.main_layout.addLayout(self.sku_status_layout)
-
-        # Create widgets and hide them initially (create enough for max SKUs you might have)
-        self.sku_widgets = (
-            []
-        )  # List to hold tuples of (label, dropdown, horizontal layout)
-
-        for _ in range(5):
-            # Horizontal layout for each SKU
-            h_layout = QHBoxLayout()
-
-            # SKU label
-            sku_label = QLabel("SKU")
-            sku_label.setAlignment(Qt.AlignLeft)
-            h_layout.addWidget(sku_label)
-
-            # Dropdown for status
-            status_dropdown = QComboBox()
-            status_dropdown.setMinimumHeight(self.fields_min_height - 10)
-            status_dropdown.addItems(["Good", "Damaged", "Missing"])
-            status_dropdown.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-            status_dropdown.currentIndexChanged.connect(self.on_parts_condition_change)
-            h_layout.addWidget(status_dropdown)
-
-            # Add the horizontal layout to the vertical layout
-            self.sku_status_layout.addLayout(h_layout)
-
-            # Hide the widgets (not the layout)
-            sku_label.setVisible(False)
-            status_dropdown.setVisible(False)
-
-            # Store the widgets in a list for later access
-            self.sku_widgets.append((h_layout, sku_label, status_dropdown))
-
-        # Now wrap sku_status_layout in a widget
-        self.sku_status_widget = QWidget()
-        self.sku_status_widget.setLayout(self.sku_status_layout)
-
-        # Create a scroll area and add the widget to it
-        self.sku_scroll_area = QScrollArea()
-        self.sku_scroll_area.setMinimumHeight(250)
-        self.sku_scroll_area.setWidgetResizable(True)  # Allow resizing
-        self.sku_scroll_area.setWidget(
-            self.sku_status_widget
-        )  # Add the layout's widget to the scroll area
-
-        # # Add the scroll area to the main layout
-        # self.main_layout.addWidget(self.sku_scroll_area)
+        # Component table: one row per component with its condition
+        self.component_model = ComponentTableModel(self)
+        self.component_model.conditionChanged.connect(self.on_parts_condition_change)
+        self.component_view = ComponentTableView(self.fields_min_height - 10)
+        self.component_view.setModel(self.component_model)
+        self.component_view.setMinimumHeight(250)
 
         # Note section-------------------------------------------------------
         # Create vertical layout for the note section
@@ -368,7 +639,7 @@ class MainWindow(QMainWindow):
         self.note_other_sku_layout = QHBoxLayout()
         # self.note_other_sku_layout.addLayout(self.other_sku_layout)
 
-        self.note_other_sku_layout.addWidget(self.sku_scroll_area)
+        self.note_other_sku_layout.addWidget(self.component_view)
         self.note_other_sku_layout.addLayout(self.note_layout)
 
         # Add the note layout to the main layout
@@ -450,34 +721,72 @@ class MainWindow(QMainWindow):
         self.main_layout.addLayout(self.button_layout)
 
         # Pallet section-----------------------------------------------------
-        # Initialize the pallet layout
-        self.pallet_layout = QVBoxLayout()
-        self.pallet_layout.setSpacing(10)
-        self.pallet_widget = QWidget()
-        self.pallet_widget.setLayout(self.pallet_layout)
-
-        # Create the scroll area for the pallet layout
-        self.pallet_scroll_area = QScrollArea()
-        self.pallet_scroll_area.setWidgetResizable(True)
-        self.pallet_scroll_area.setWidget(self.pallet_widget)
-        self.pallet_scroll_area.setMinimumHeight(200)
-        self.pallet_scroll_area.setMinimumWidth(450)
-        self.pallet_scroll_area.setVisible(False)
+        # Create the pallet list, its rows are painted on demand from the model
+        self.pallet_model = PalletListModel(self)
+        self.pallet_view = PalletListView()
+        self.pallet_view.setModel(self.pallet_model)
+        self.pallet_view.clicked.connect(
+            lambda index: self.on_sku_clicked(
+                self.pallet_model.session_row(index.row())
+            )
+        )
+        self.pallet_view.setMinimumHeight(200)
+        self.pallet_view.setMinimumWidth(450)
+
+        # Create a label for the pallet progress
+        self.pallet_progress_label = QLabel(" ")
+        self.pallet_progress_label.setAlignment(Qt.AlignLeft)
+
+        # Create the pallet filter, scanning a SKU into it jumps to its row
+        self.pallet_filter_field = QLineEdit()
+        self.pallet_filter_field.setPlaceholderText("Filter by SKU or component")
+        self.pallet_filter_field.setClearButtonEnabled(True)
+        self.pallet_filter_field.textChanged.connect(self.apply_pallet_filter)
+        self.pallet_filter_field.returnPressed.connect(self.jump_to_filtered_sku)
+        self.pallet_status_filter = QComboBox()
+        self.pallet_status_filter.addItems(["All", "Received", "Pending", "Wrong Part"])
+        self.pallet_status_filter.currentIndexChanged.connect(self.apply_pallet_filter)
+        self.pallet_filter_layout = QHBoxLayout()
+        self.pallet_filter_layout.addWidget(self.pallet_filter_field)
+        self.pallet_filter_layout.addWidget(self.pallet_status_filter)
+
+        # Wrap the pallet progress, filter and list in a panel shown only for pallets
+        self.pallet_panel_layout = QVBoxLayout()
+        self.pallet_panel_layout.setContentsMargins(0, 0, 0, 0)
+        self.pallet_panel_layout.addWidget(self.pallet_progress_label)
+        self.pallet_panel_layout.addLayout(self.pallet_filter_layout)
+        self.pallet_panel_layout.addWidget(self.pallet_view)
+        self.pallet_panel = QWidget()
+        self.pallet_panel.setLayout(self.pallet_panel_layout)
+        self.pallet_panel.setVisible(False)
 
         # Set the layout to a central widget
         central_widget = QWidget()
         main_layout_wrapper = QHBoxLayout()
         main_layout_wrapper.addLayout(self.main_layout)
-        main_layout_wrapper.addWidget(self.pallet_scroll_area)
+        main_layout_wrapper.addWidget(self.pallet_panel)
         central_widget.setLayout(main_layout_wrapper)
         self.setCentralWidget(central_widget)
 
         # Center the window
         # self.center()
 
+        # Connect once the window is up, then preload the expected arrivals
+        QTimer.singleShot(0, self.connect_in_background)
+
+        # Follow the progress other stations make on the open pallet
+        self.pallet_poll_timer = QTimer(self)
+        self.pallet_poll_timer.timeout.connect(self.poll_pallet_changes)
+
+        # Save the caches regularly, so a crash doesn't lose them
+        self.snapshot_timer = QTimer(self)
+        self.snapshot_timer.timeout.connect(self.save_snapshot_in_background)
+        self.snapshot_timer.start(SNAPSHOT["interval"] * 1000)
+
     # Checking in the return ------------------------------------------------------------------
 
     def on_check_in(self):
+        self.edit_buffer.flush()
         if self.check_db_connection():
             tracking_number = self.tracking_number_field.text()
 
@@ -485,120 +794,426 @@ class MainWindow(QMainWindow):
                 if self.ready_to_click_next():
 
                     not_updated = []
-                    for result in self.results:
-                        status = result[4]
-                        note = result[5]
-                        sku = result[0]
-                        components = result[-1]
-                        conditions = [condition for _, condition in components.items()]
-                        if "green" in self.sku_status_labels[sku].styleSheet():
-                            successfull = self.db.check_in_return(
-                                tracking_number, status, note, sku, components
-                            )
-                            if not successfull:
-                                not_updated.append(sku)
-
-                    self.db.update_pallet_note(
-                        tracking_number, self.current_pallet_note
-                    )
-
-                    if not not_updated:
-                        self.check_in_label.setStyleSheet("color: green")
-                        self.check_in_label.setText("Check In Successfull")
+                    conflicts = []  # Changed by another station meanwhile
+                    checked_in = []
+                    checked_in_rows = []
+                    # Written along with the first SKU checked in
+                    pallet_note = self.edited_pallet_note()
+                    try:
+                        for row in self.pallet_session.rows_to_check_in():
+                            line = self.results[row]
+                            try:
+                                row_version = self.db.check_in_return(
+                                    tracking_number,
+                                    line.status,
+                                    line.note,
+                                    line.sku,
+                                    line.parts,
+                                    line.row_version,
+                                    pallet_note,
+                                )
+                            except WriteConflict:
+                                conflicts.append(line.sku)
+                                continue
+                            if not row_version:
+                                not_updated.append(line.sku)
+                            else:
+                                line.row_version = row_version
+                                checked_in.append(line)
+                                checked_in_rows.append(row)
+                                pallet_note = None
+
+                        if not self.save_pallet_note(tracking_number):
+                            not_updated.append("pallet note")
+                    except DatabaseUnavailable as e:
+                        # The SKUs committed before the outage aren't checked in again
+                        for row in checked_in_rows:
+                            self.pallet_session.set_received(row, True)
+                        self.update_pallet_progress()
+                        self.show_results()
+                        self.print_bin_labels(tracking_number, checked_in)
+                        self.report_database_unavailable(e)
+                        return
+                    self.print_bin_labels(tracking_number, checked_in)
+
+                    if not not_updated and not conflicts:
+                        self.undone_tracking_number = None
+                        self.check_in_label.set_message("Check In Successfull", "ok")
                         self.reset_fields()
                         return
+
+                    # The pallet stays open, with the SKUs checked in marked and counted
+                    for row in checked_in_rows:
+                        self.pallet_session.set_received(row, True)
+                    self.update_pallet_progress()
+                    self.show_results()
+                    if conflicts:
+                        self.merge_conflicts(tracking_number, conflicts)
                     else:
-                        self.check_in_label.setStyleSheet("color: red")
-                        self.check_in_label.setText(
-                            f"Error checking in: {', '.join(not_updated)}"
+                        self.check_in_label.set_message(
+                            f"Error checking in: {', '.join(not_updated)}", "error"
                         )
-                        return
+                    return
 
             # Getting the values from the fields
             status = self.status_dropdown.currentText()
             note = self.note_field.toPlainText()
-            # sku = self.sku_field.text()
-            sku = self.results[self.current_result_index][0]
+            line = self.results[self.current_result_index]
+            sku = line.sku
             components = self.get_sku_status_layout()
-            conditions = [condition for sku, condition in components.items()]
 
             # Making sure the status has been selected
             if status == "Select Status":
-                self.check_in_label.setStyleSheet("color: red")
-                self.check_in_label.setText("Please select a status.")
-                return
-            # Making sure the SKU is not empty if the status is "Wrong Part"
-            elif status == "Wrong Part" and not sku:
-                self.check_in_label.setStyleSheet("color: red")
-                self.check_in_label.setText("Please enter a SKU.")
+                self.check_in_label.set_message("Please select a status.", "error")
                 return
-            # Making sure the SKU has been verified if the status is "Wrong Part"
-            elif status == "Wrong Part" and self.sku_layout_is_not_visible():
-                self.check_in_label.setStyleSheet("color: red")
-                self.check_in_label.setText("Please click search to verify SKU.")
+            error = check_in_error(line, not self.sku_layout_is_not_visible())
+            if error:
+                self.check_in_label.set_message(error, "error")
                 return
-            # Making sure if status is incomplete, there are no missing parts
-            elif status == "Incomplete" and "Missing" not in conditions:
-                self.check_in_label.setStyleSheet("color: red")
-                self.check_in_label.setText(
-                    "Can't be Incomplete. There are no missing parts."
+
+            try:
+                row_version = self.db.check_in_return(
+                    tracking_number, status, note, sku, components, line.row_version
                 )
+            except DatabaseUnavailable as e:
+                self.report_database_unavailable(e)
                 return
-            elif status == "Complete" and "Missing" in conditions:
-                self.check_in_label.setStyleSheet("color: red")
-                self.check_in_label.setText(
-                    "Can't be Complete. There are missing parts."
-                )
+            except WriteConflict:
+                self.merge_conflicts(tracking_number, [sku])
                 return
 
-            successfull = self.db.check_in_return(
-                tracking_number, status, note, sku, components
-            )
-
-            if not successfull:
-                self.check_in_label.setStyleSheet("color: red")
-                self.check_in_label.setText("Error checking in.")
+            if not row_version:
+                self.check_in_label.set_message("Error checking in.", "error")
                 return
+            line.row_version = row_version
+            self.undone_tracking_number = None  # Rapid mode applies to it again
 
-            if self.current_tracking_number_was_checked_in and successfull:
-                self.check_in_label.setStyleSheet("color: green")
-                self.check_in_label.setText("Updated Successfully.")
-            elif successfull:
-                self.check_in_label.setStyleSheet("color: green")
-                self.check_in_label.setText("Check In Successfull")
+            self.print_bin_labels(
+                tracking_number, [self.results[self.current_result_index]]
+            )
+
+            if self.current_tracking_number_was_checked_in:
+                self.check_in_label.set_message("Updated Successfully.", "ok")
+            else:
+                self.check_in_label.set_message("Check In Successfull", "ok")
 
             self.reset_fields()
             return
 
+    def edited_pallet_note(self):
+        """The pallet note and the row version it was read at, None if not edited."""
+        note = self.current_pallet_note
+        if note is None or note == self.loaded_pallet_note:
+            return None
+        return note, self.pallet_note_version
+
+    def save_pallet_note(self, tracking_number):
+        """
+        Make sure an edited pallet note was saved with the check in, or write it on
+        its own, merging it with the note of another station that edited it
+        meanwhile. Returns False if it couldn't be saved.
+        """
+        if self.edited_pallet_note() is None:
+            return True
+        note = self.current_pallet_note
+        for attempt in range(2):
+            theirs, version = self.db.get_pallet_note(tracking_number)
+            if theirs == note:
+                break  # Saved with the check in
+            if theirs != self.loaded_pallet_note:
+                if note and note in theirs:
+                    note = theirs
+                    break
+                # Both stations edited it, keep the two notes
+                note = f"{theirs}\n{note}" if theirs else note
+                self.loaded_pallet_note = theirs
+            try:
+                version = self.db.save_pallet_note(tracking_number, note, version)
+                break
+            except WriteConflict:
+                if attempt:
+                    return False
+        self.current_pallet_note = self.loaded_pallet_note = note
+        self.pallet_note_version = version
+        return True
+
+    def merge_conflicts(self, tracking_number, skus):
+        """
+        Reload the SKUs another station changed since the return was opened.
+        SKUs it checked in take its status, note and parts, the others keep the
+        edits made here, on the new row version so they can be checked in again.
+        """
+        try:
+            latest = self.db.search_tracking_number(tracking_number) or []
+        except DatabaseUnavailable as e:
+            self.report_database_unavailable(e)
+            return
+        latest = {line.sku: line for line in latest}
+
+        taken = []
+        for row, line in enumerate(self.results):
+            current = latest.get(line.sku)
+            if line.sku not in skus or current is None:
+                continue
+            line.row_version = current.row_version
+            if current.received:
+                self.adopt_line(row, current)
+                taken.append(line.sku)
+
+        if self.pallet_session:
+            self.refresh_status_filter()
+            self.update_pallet_progress()
+        self.show_results()
+        message = f"Changed by another station: {', '.join(skus)}."
+        if taken:
+            message += f" Loaded its check in of {', '.join(taken)}."
+        if len(taken) < len(skus):
+            message += " Check in again to keep the changes made here."
+        self.check_in_label.set_message(message, "error")
+
+    def adopt_line(self, row, current):
+        """Take the status, note and parts another station left a SKU with."""
+        line = self.results[row]
+        line.row_version = current.row_version
+        line.note = current.note
+        line.components = current.components
+        line.wrong_parts = current.wrong_parts
+        if self.pallet_session:
+            self.pallet_session.set_status(row, current.status)
+            self.pallet_session.set_received(row, current.received)
+            self.pallet_model.set_ready(row, bool(current.received))
+        else:
+            line.status = current.status
+            line.received = current.received
+
+    # Pallet change polling -------------------------------------------------------
+
+    def start_pallet_polling(self):
+        self.pallet_version = max(line.row_version or 0 for line in self.results)
+        self.pallet_reconciled_at = time.monotonic()
+        if PALLET_POLLING["interval"]:
+            self.pallet_poll_timer.start(PALLET_POLLING["interval"] * 1000)
+
+    def stop_pallet_polling(self):
+        self.pallet_poll_timer.stop()
+        self.pallet_version = None
+
+    def poll_pallet_changes(self):
+        """Fetch the SKUs of the open pallet changed since the last poll."""
+        if not self.pallet_session or self.search_in_progress():
+            return
+        if self.pallet_poll_job is not None and self.pallet_poll_job.isRunning():
+            return
+
+        tracking_number = self.current_tracking_number
+        return_id_numbers = None
+        if time.monotonic() - self.pallet_reconciled_at >= PALLET_POLLING["reconcile"]:
+            return_id_numbers = list(self.pallet_session.sku_amounts)
+            self.pallet_reconciled_at = time.monotonic()
+        self.pallet_poll_job = LabelUpdater(
+            self.run_pallet_poll_task,
+            args=(tracking_number, self.pallet_version, return_id_numbers),
+        )
+        self.pallet_poll_job.update_done.connect(
+            lambda result: self.apply_pallet_changes(tracking_number, *result)
+        )
+        self.pallet_poll_job.update_failed.connect(
+            lambda error: print(f"Failed to check the pallet for changes: {error}")
+        )
+        self.pallet_poll_job.start()
+
+    def run_pallet_poll_task(self, tracking_number, row_version, return_id_numbers):
+        """
+        This function will be run in the background. It fetches the changed SKUs of
+        the pallet, and recounts its received SKUs if return id numbers are given.
+        """
+        changes, row_version = self.db.get_changed_return_lines(
+            tracking_number, row_version
+        )
+        sku_amounts = None
+        if return_id_numbers:
+            sku_amounts = self.db.get_sku_amounts(return_id_numbers)
+        return changes, row_version, sku_amounts
+
+    def apply_pallet_changes(
+        self, tracking_number, changes, row_version, sku_amounts=None
+    ):
+        """
+        Update the rows of the open pallet that another station checked in or undid,
+        in place. Rows it only edited are left to the check in conflict handling.
+        The received counts follow the rows and are replaced by the database's
+        counts when they come along.
+        """
+        if not self.pallet_session or tracking_number != self.current_tracking_number:
+            return
+        # Not past the row versions of check ins still open, they come with a later poll
+        self.pallet_version = max(self.pallet_version, row_version)
+        if not (changes or sku_amounts):
+            return
+        self.edit_buffer.flush()  # So the form doesn't drop edits when it is redrawn
+
+        rows = {line.sku: row for row, line in enumerate(self.results)}
+        sku_amounts = dict(sku_amounts or {})
+        changed_rows = set()
+        for current in changes:
+            sku_amounts[current.return_id_number] = (
+                current.expected_sku_amount,
+                current.sku_amount_received,
+            )
+            row = rows.get(current.sku)
+            if row is None:
+                continue
+            line = self.results[row]
+            # Skips this station's own check ins, the line already has their version
+            if (line.row_version or 0) >= current.row_version:
+                continue
+            if current.received or line.received:
+                self.adopt_line(row, current)
+                changed_rows.add(row)
+
+        self.pallet_session.reconcile_sku_amounts(sku_amounts)
+
+        if changed_rows:
+            self.update_pallet_progress()
+            self.refresh_status_filter()
+        self.show_results()
+
+    # Rapid mode ------------------------------------------------------------------
+
+    def rapid_check_in(self, line):
+        """Check in a single SKU return as Complete with every part Good."""
+        error = rapid_check_in_error(line)
+        if error:
+            # Left in the form to be checked in by hand
+            self.check_in_label.set_message(error, "error")
+            return
+
+        previous = (line.status, line.note, dict(line.components))
+        line.status = "Complete"
+        line.components = {part: "Good" for part in line.components}
+        self.show_results()
+        self.status_dropdown.setDisabled(True)
+        self.check_in_label.set_message("Checking in...", "ok")
+
+        tracking_number = self.current_tracking_number
+        self.rapid_check_in_job = LabelUpdater(
+            self.db.check_in_return,
+            args=(
+                tracking_number,
+                line.status,
+                line.note,
+                line.sku,
+                line.parts,
+                line.row_version,
+            ),
+        )
+        self.rapid_check_in_job.update_done.connect(
+            lambda row_version: self.handle_rapid_check_in(
+                row_version, tracking_number, line, previous
+            )
+        )
+        self.rapid_check_in_job.update_failed.connect(self.handle_failed_rapid_check_in)
+        self.rapid_check_in_job.start()
+
+    def handle_rapid_check_in(self, row_version, tracking_number, line, previous):
+        if not row_version:
+            self.handle_failed_rapid_check_in("Error checking in.")
+            return
+        line.row_version = row_version
+
+        self.print_bin_labels(tracking_number, [line])
+        self.check_in_label.set_message(f"{tracking_number} checked in.", "ok")
+        self.last_rapid_check_in = (tracking_number, line, previous)
+        self.undo_button.setVisible(True)
+        self.undo_timer.start(UNDO_WINDOW_MS)
+        self.reset_fields()
+
+    def handle_failed_rapid_check_in(self, error_message):
+        # Leave the return in the form to be checked in by hand
+        self.status_dropdown.setDisabled(False)
+        self.check_in_label.set_message(error_message, "error")
+
+    def undo_rapid_check_in(self):
+        if self.last_rapid_check_in is None:
+            return
+        tracking_number, line, (status, note, components) = self.last_rapid_check_in
+        self.expire_undo()
+
+        if not self.check_db_connection():
+            return
+        try:
+            undone = self.db.undo_check_in(
+                tracking_number, line.sku, status, note, components, line.row_version
+            )
+        except DatabaseUnavailable as e:
+            self.report_database_unavailable(e)
+            return
+        except WriteConflict as e:
+            self.check_in_label.set_message(f"Not undone: {e}", "error")
+            return
+        if not undone:
+            self.check_in_label.set_message(
+                f"Could not undo the check in of {tracking_number}.", "error"
+            )
+            return
+
+        self.undone_tracking_number = tracking_number
+        self.check_in_label.set_message(f"Check in of {tracking_number} undone.", "ok")
+        # Reopen the return to be checked in by hand unless another one is open
+        if self.results is None and self.tracking_number_field.isEnabled():
+            self.tracking_number_field.setText(tracking_number)
+            self.search_tracking_number()
+
+    def expire_undo(self):
+        self.undo_timer.stop()
+        self.undo_button.setVisible(False)
+        self.last_rapid_check_in = None
+
     # Searching for a tracking number --------------------------------------------------------
 
     def clean_fedex_tracking_number(self, tracking_number):
-        # Step 1: Remove any non-digit characters
-        cleaned_number = "".join(filter(str.isdigit, tracking_number))
+        cleaned_number = clean_tracking_number(tracking_number)
 
-        if len(cleaned_number) > 30:
-            self.tracking_number_field.setText(cleaned_number[-12:])
-            return cleaned_number[-12:]
-        else:
-            return tracking_number
+        if cleaned_number != tracking_number:
+            self.tracking_number_field.setText(cleaned_number)
+        return cleaned_number
 
-    def run_search_task(self, tracking_number):
+    def run_search_task(self, tracking_number, cancel_token):
         """
-        This function will be run in the background. It performs the search in the database.
+        This function will be run in the background. It performs the search in the database,
+        and reads the note of a pallet so the UI thread doesn't wait for it.
+        :return: The results, the pallet note with its row version, and the error
+        reading the note if the database was unavailable.
         """
-        if self.check_db_connection():
-            results = self.db.search_tracking_number(tracking_number)
-            return results
-        return None
+        # Answered from memory, even while the database is unreachable
+        results = self.db.cached_search(tracking_number)
+        if results is None and self.check_db_connection():
+            results = self.db.search_tracking_number(
+                tracking_number, cancel_token=cancel_token
+            )
+
+        pallet_note = error = None
+        if results and len(results) > 1:
+            try:
+                pallet_note = self.db.get_pallet_note(
+                    tracking_number, cancel_token=cancel_token
+                )
+            except DatabaseUnavailable as e:
+                error = e
+        return results, pallet_note, error
 
     def search_tracking_number(self):
+        self.edit_buffer.discard()
+        # A new scan replaces the search still running
+        self.cancel_search()
+
         # Step 1: Clean the tracking number
         self.reset_fields(clear_tracking=False)
         self.status_dropdown.setDisabled(False)
         tracking_number = self.tracking_number_field.text().upper().replace(" ", "")
         tracking_number = self.clean_fedex_tracking_number(tracking_number)
 
-        self.tracking_number_field.setDisabled(True)
+        # The field stays enabled while searching so another scan can replace it
         self.current_tracking_number = tracking_number
 
         # Step 2: Set up a QTimer in the main thread to update the label
@@ -610,22 +1225,63 @@ class MainWindow(QMainWindow):
         self.loading_timer.start(500)  # Update the label every 500ms
 
         # Step 3: Start the LabelUpdater (worker) to run the long-running task in a background thread
-        self.label_updater = LabelUpdater(self.run_search_task, args=(tracking_number,))
+        generation = self.search_generation
+        self.search_token = CancelToken()
+        self.search_job = LabelUpdater(
+            self.run_search_task, args=(tracking_number, self.search_token)
+        )
+        self.label_updater = self.search_job
 
-        # Connect the signals
-        self.label_updater.update_done.connect(self.handle_search_results)
-        self.label_updater.update_failed.connect(self.handle_search_failed)
+        # Connect the signals, dropping the results of superseded searches
+        self.search_job.update_done.connect(
+            lambda results: self.if_current_search(
+                generation, self.handle_search_results, results
+            )
+        )
+        self.search_job.update_failed.connect(
+            lambda error: self.if_current_search(
+                generation, self.handle_search_failed, error
+            )
+        )
 
         # Start the worker thread
-        self.label_updater.start()
+        self.search_job.start()
+
+    def if_current_search(self, generation, handler, value):
+        if generation == self.search_generation:
+            handler(value)
+
+    def search_in_progress(self):
+        return self.search_job is not None and self.search_job.isRunning()
+
+    def cancel_search(self):
+        """Abort the running search in the driver and ignore its results."""
+        self.search_generation += 1
+        if not self.search_in_progress():
+            return
+
+        self.cancel_job(self.search_job, self.search_token)
+        self.stop_loading_animation()
+        self.search_job = None
+
+    def cancel_job(self, job, cancel_token):
+        """Cancel the database operation of a background job without waiting for it."""
+        self.db.cancel(cancel_token)
+        # Keep a reference so the thread is not destroyed while it winds down
+        self.cancelled_jobs.append(job)
+        job.finished.connect(lambda: self.cancelled_jobs.remove(job))
+
+    def on_tracking_number_change(self, text):
+        # Clearing the field while searching cancels the search
+        if not text and self.search_in_progress():
+            self.cancel_search()
 
     def update_loading_label(self, action):
         """
         Update the label text with a loading message.
         """
-        self.check_in_label.setStyleSheet("color: green")
         dots = "." * (self.loading_step % 4)  # Cycle between 0 to 3 dots
-        self.check_in_label.setText(f"{action}{dots}")
+        self.check_in_label.set_message(f"{action}{dots}", "ok")
         self.loading_step += 1
 
     def stop_loading_animation(self):
@@ -636,170 +1292,172 @@ class MainWindow(QMainWindow):
             self.loading_timer.stop()
         self.check_in_label.setText("")  # Clear the label text
 
-    def handle_search_results(self, results):
+    def handle_search_results(self, found):
+        results, pallet_note, error = found
         self.stop_loading_animation()  # Stop the loading animation
+        self.tracking_number_field.setDisabled(True)
+        self.update_cache_stats()
         if not results:
-            self.check_in_label.setStyleSheet("color: red")
-            self.check_in_label.setText("Tracking Number not found.")
+            self.check_in_label.set_message("Tracking Number not found.", "error")
         else:
             self.results = results
+            self.check_in_label.setText(" ")
             if len(results) > 1:
                 self.populate_pallet_list(results)
+                self.start_pallet_polling()
                 self.is_pallet = True
                 self.print_checklist_button.setVisible(True)
                 self.mark_selected_sku(0)
-                self.current_pallet_note = self.db.get_pallet_note(
-                    self.current_tracking_number
-                )
-                self.pallet_note_button.setVisible(True)
-
-            self.check_in_label.setText(" ")
+                if error is None:
+                    self.current_pallet_note, self.pallet_note_version = pallet_note
+                    self.loaded_pallet_note = self.current_pallet_note
+                    self.pallet_note_button.setVisible(True)
+                else:
+                    # Left as None so checking in doesn't overwrite the note
+                    self.report_database_unavailable(error)
 
             self.show_results()
 
+            if self.current_tracking_number != self.undone_tracking_number:
+                self.undone_tracking_number = None  # Another box was scanned
+            if (
+                self.rapid_mode_checkbox.isChecked()
+                and len(results) == 1
+                and not results[0].received
+                and self.undone_tracking_number is None
+            ):
+                self.rapid_check_in(results[0])
+
     def handle_search_failed(self, error_message):
         self.stop_loading_animation()  # Stop the loading animation
-        self.check_in_label.setStyleSheet("color: red")
-        self.check_in_label.setText(f"Error: {error_message}")
+        self.tracking_number_field.setDisabled(True)
+        self.check_in_label.set_message(f"Error: {error_message}", "error")
 
     # Current result modifiers --------------------------------------------------------
 
     def on_status_change(self):
+        self.edit_buffer.flush()
         status = self.status_dropdown.currentText()
+        line = self.results[self.current_result_index]
 
         if status == "Wrong Part":
-            if self.results[self.current_result_index][4] != "Wrong Part":
-                self.swap_parts()
             self.update_current_status(status)
             self.update_note("Wrong sku was received.")
-            self.clear_sku_status_layout()
-
-            self.sku_field.setText("")
-            self.sku_field.setDisabled(False)
-            self.search_sku_button.setVisible(True)
 
         elif status == "Wrong Product":
-            if self.results[self.current_result_index][4] == "Wrong Part":
-                self.swap_parts()
+            if line.status == "Wrong Part":
                 self.delete_worng_parts()
 
             self.update_current_status(status)
-            self.reset_fields(clear_tracking=False)
             self.update_note("Not our product.")
-            components = self.switch_all_conditions("Missing")
-            self.update_sku_status_layout(components)
+            self.switch_all_conditions("Missing")
 
         elif status == "Select Status":
-            if self.results[self.current_result_index][4] == "Wrong Part":
-                self.swap_parts()
+            if line.status == "Wrong Part":
                 self.delete_worng_parts()
 
             self.update_current_status(status)
-            self.reset_fields(clear_tracking=False)
 
         else:
-            if self.results[self.current_result_index][4] == "Wrong Part":
-                self.swap_parts()
+            if line.status == "Wrong Part":
                 self.delete_worng_parts()
                 self.switch_all_conditions("Good")
                 self.reset_note_to_empty()
 
-            if self.results[self.current_result_index][4] == "Wrong Product":
+            if line.status == "Wrong Product":
                 self.switch_all_conditions("Good")
                 self.reset_note_to_empty()
 
             self.update_current_status(status)
-            self.reset_fields(clear_tracking=False)
 
         self.show_results()
 
     def switch_all_conditions(self, new_condition):
-        components = self.results[self.current_result_index][-1]
-        components = {part: new_condition for part, contition in components.items()}
-        self.update_components(components)
-        return components
+        line = self.results[self.current_result_index]
+        line.components = {part: new_condition for part in line.components}
+        return line.components
 
     def update_note(self, note):
-        results = list(self.results[self.current_result_index])
-        results[5] = note
-        self.results[self.current_result_index] = tuple(results)
-        self.note_field.setText(note)
-
-    def update_components(self, components):
-        results = list(self.results[self.current_result_index])
-        results[-1] = components
-        self.results[self.current_result_index] = tuple(results)
+        self.results[self.current_result_index].note = note
 
     def update_current_status(self, new_status):
-        if self.results[self.current_result_index][4] != new_status:
-            results = list(self.results[self.current_result_index])
-            results[4] = new_status
-            self.results[self.current_result_index] = tuple(results)
-
-    def swap_parts(self):
-        reults_list = list(self.results[self.current_result_index])
-        temp = reults_list[-2]
-        reults_list[-2] = reults_list[-1]
-        reults_list[-1] = temp
-        self.results[self.current_result_index] = tuple(reults_list)
+        if self.pallet_session:
+            self.pallet_session.set_status(self.current_result_index, new_status)
+            self.refresh_status_filter()
+        else:
+            self.results[self.current_result_index].status = new_status
 
     def delete_worng_parts(self):
-        results = list(self.results[self.current_result_index])
-        results[-2] = {}
-        self.results[self.current_result_index] = tuple(results)
+        line = self.results[self.current_result_index]
+        line.wrong_parts = {}
+        line.wrong_sku = ""
 
     def search_sku_button_click(self):
+        self.edit_buffer.flush()
         if self.check_db_connection():
             sku = self.sku_field.text().upper()
             self.sku_field.setText(sku)
-            components = self.db.verify_sku(sku)
+            try:
+                components = self.db.verify_sku(sku)
+            except DatabaseUnavailable as e:
+                self.report_database_unavailable(e)
+                return
 
             if self.is_pallet and self.sku_in_pallet(sku):
-                self.check_in_label.setStyleSheet("color: red")
-                self.check_in_label.setText("The SKU is already in the pallet.")
+                self.check_in_label.set_message(
+                    "The SKU is already in the pallet.", "error"
+                )
                 return
 
+            line = self.results[self.current_result_index]
             if components:
-                self.check_in_label.setStyleSheet("color: green")
-                self.check_in_label.setText("SKU found.")
-                self.update_sku_status_layout(components)
-                components = {part: "Good" for part in components}
-                self.update_components(components)
+                self.check_in_label.set_message("SKU found.", "ok")
+                line.wrong_parts = {part: "Good" for part in components}
+                line.wrong_sku = sku
+                self.show_results()
                 self.sku_field.clearFocus()
             else:
-                self.check_in_label.setStyleSheet("color: red")
-                self.check_in_label.setText("SKU not found.")
+                self.check_in_label.set_message("SKU not found.", "error")
+                line.wrong_parts = {}
+                line.wrong_sku = ""
                 self.clear_sku_status_layout()
 
     def sku_in_pallet(self, sku):
-        for result in self.results:
-            if sku == self.sku_cleanner(result[0]):
-                return True
-        return False
+        return self.pallet_session.contains(sku)
 
     def reset_note_to_empty(self):
-        self.note_field.setText("")
-        self.on_note_change()
+        self.update_note("")
 
     # On changes -------------------------------------------------------------------
-    def on_parts_condition_change(self):
+    def on_parts_condition_change(self, part, condition):
         if self.results:
-            results = list(self.results[self.current_result_index])
-            if not self.do_not_update_state:
-                new_components = self.get_sku_status_layout()
-                results[-1] = new_components
-                self.results[self.current_result_index] = tuple(results)
+            self.edit_buffer.mark(("part", part))
 
     def on_note_change(self):
         if self.results:
-            results = list(self.results[self.current_result_index])
-            if self.status_dropdown.currentText() not in [
-                "Wrong Product",
-                "Wrong Part",
-            ]:
-                new_note = self.note_field.toPlainText()
-                results[5] = new_note
-                self.results[self.current_result_index] = tuple(results)
+            self.edit_buffer.mark("note")
+
+    def apply_pending_edits(self, pending):
+        """
+        Writes the coalesced edits into the current return line.
+        :param pending: "note" and/or ("part", component) for changed conditions.
+        """
+        if not self.results:
+            return
+
+        line = self.results[self.current_result_index]
+        for key in pending:
+            if key == "note":
+                if self.status_dropdown.currentText() not in [
+                    "Wrong Product",
+                    "Wrong Part",
+                ]:
+                    line.note = self.note_field.toPlainText()
+            else:
+                part = key[1]
+                condition = self.component_model.condition(part)
+                if condition is not None and part in line.parts:
+                    line.parts[part] = condition
 
     # Pallets -------------------------------------------------------------------
 
@@ -818,7 +1476,8 @@ class MainWindow(QMainWindow):
             self.current_pallet_note = dialog.get_text()
 
     def print_checklist(self):
-        authorization_id = self.results[0][1]
+        self.edit_buffer.flush()
+        authorization_id = self.results[0].return_id_number
         tracking_number = self.current_tracking_number
 
         # Step 1: Set up a QTimer in the main thread to update the label
@@ -831,7 +1490,7 @@ class MainWindow(QMainWindow):
 
         # Step 2: Start the LabelUpdater (worker) to run the long-running task in a background thread
         self.label_updater = LabelUpdater(
-            generate_and_print_pdf,
+            self.run_print_task,
             args=(
                 authorization_id,
                 tracking_number,
@@ -846,214 +1505,406 @@ class MainWindow(QMainWindow):
         # Start the worker thread
         self.label_updater.start()
 
+    def run_print_task(self, authorization_id, tracking_number, results):
+        """
+        This function will be run in the background. It prints the checklist of a
+        pallet, loading ReportLab on first use instead of at startup.
+        """
+        from pallet_form import generate_and_print_pdf
+
+        generate_and_print_pdf(authorization_id, tracking_number, results)
+
+    def open_pre_staging_dialog(self):
+        dialog = PreStagingDialog(
+            self.run_pre_staging_task, self.cancel_job, parent=self
+        )
+        if dialog.exec_() != QDialog.Accepted or not dialog.selected_tracking_number:
+            return
+        if not self.tracking_number_field.isEnabled():
+            return  # A search is still running
+
+        self.reset_fields()
+        self.tracking_number_field.setText(dialog.selected_tracking_number)
+        self.search_tracking_number()
+
+    def run_pre_staging_task(self, tracking_numbers, cancel_token):
+        """
+        This function will be run in the background. It looks up every tracking number
+        with a few set-based queries.
+        """
+        if not self.check_db_connection():
+            raise ConnectionError("Disconnected from Database")
+        return self.db.search_tracking_numbers(
+            tracking_numbers, cancel_token=cancel_token
+        )
+
+    def connect_in_background(self):
+        self.connect_job = LabelUpdater(self.run_connect_task)
+        self.connect_job.update_done.connect(self.handle_connected)
+        self.connect_job.update_failed.connect(self.handle_failed_connect)
+        self.connect_job.start()
+
+    def run_connect_task(self):
+        """
+        This function will be run in the background. It warms the caches from the
+        snapshot, then opens the database connection and returns how long it took.
+        """
+        self.load_snapshot()
+        start = time.perf_counter()
+        self.db.reconnect()
+        return time.perf_counter() - start
+
+    def handle_connected(self, seconds):
+        self.db_label.set_message("Connected to Database", "ok")
+        if self.startup_timer:
+            self.startup_timer.record("database connect", seconds)
+            self.startup_timer.report()
+        self.preload_expected_arrivals()
+
+    def handle_failed_connect(self, error_message):
+        # Searches retry the connection, updating the label when it succeeds
+        print(f"Failed to connect to the database: {error_message}")
+        self.db_label.set_message("Disconnected from Database", "error")
+        if self.startup_timer:
+            self.startup_timer.report()
+
+    def preload_expected_arrivals(self):
+        if self.preload_job is not None and self.preload_job.isRunning():
+            return
+        self.preload_button.setDisabled(True)
+
+        # Preload on a connection of its own so scans aren't blocked meanwhile
+        self.preload_job = LabelUpdater(self.run_preload_task)
+        self.preload_job.update_done.connect(self.handle_preload_done)
+        self.preload_job.update_failed.connect(self.handle_failed_preload)
+        self.preload_job.start()
+
+    def run_preload_task(self):
+        """
+        This function will be run in the background. It loads the returns not received
+        yet into the cache shared with the main connection.
+        """
+        loader = ExampleDb(self.db.arrivals, DB_TIMEOUTS["preload"])
+        try:
+            count = loader.preload_expected_arrivals()
+            self.db.forget_recent_writes()
+            try:
+                self.db.sku_components.update(loader.get_sku_components())
+            except Exception as e:
+                print(f"Failed to refresh the SKU components: {e}")
+            return count
+        finally:
+            loader.close()
+
+    def handle_preload_done(self, count):
+        self.preload_button.setDisabled(False)
+        print(f"Preloaded {count} expected arrivals.")
+        self.update_cache_stats()
+
+    def handle_failed_preload(self, error_message):
+        self.preload_button.setDisabled(False)
+        print(f"Failed to preload the expected arrivals: {error_message}")
+
+    # Station snapshot --------------------------------------------------------
+
+    def load_snapshot(self):
+        snapshot = load_snapshot(self.snapshot_path)
+        if snapshot:
+            try:
+                self.db.import_caches(snapshot, SNAPSHOT["max_age"])
+                print(
+                    f"Loaded snapshot: {len(self.db.sku_components)} SKUs, "
+                    f"{len(self.db.results)} searches, {len(self.db.arrivals)} arrivals."
+                )
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Ignoring unusable snapshot: {e}")
+        self.snapshot_loaded = True
+
+    def save_snapshot(self):
+        if not self.snapshot_loaded:
+            return  # Closed before the background startup got to it
+        try:
+            save_snapshot(self.snapshot_path, self.db.export_caches())
+        except OSError as e:
+            print(f"Failed to save the snapshot: {e}")
+
+    def save_snapshot_in_background(self):
+        if self.snapshot_job is not None and self.snapshot_job.isRunning():
+            return
+        self.snapshot_job = LabelUpdater(self.save_snapshot)
+        self.snapshot_job.start()
+
+    def closeEvent(self, event):
+        self.snapshot_timer.stop()
+        if self.snapshot_job is not None:
+            self.snapshot_job.wait()
+        self.save_snapshot()
+        super().closeEvent(event)
+
+    def update_cache_stats(self):
+        arrivals = self.db.arrivals.stats()
+        results = self.db.results.stats()
+        statement_stats = self.db.statement_stats()
+        self.db_label.setToolTip(
+            f"Expected arrivals cached: {arrivals['entries']}, "
+            f"hits: {arrivals['hits']}, misses: {arrivals['misses']}\n"
+            f"Recent searches cached: {results['entries']}, "
+            f"hits: {results['hits']}, misses: {results['misses']}, "
+            f"expired: {results['expired']}\n"
+            f"Statements run: {sum(runs for runs, _ in statement_stats.values())}, "
+            f"rows sent in bulk: {sum(rows for _, rows in statement_stats.values())}"
+        )
+
+    def print_batch_checklist(self):
+        dialog = BatchChecklistDialog(parent=self)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+
+        tracking_numbers = dialog.get_tracking_numbers()
+        if not tracking_numbers:
+            return
+
+        # Step 1: Set up a QTimer in the main thread to update the label
+        self.loading_step = 0  # Reset the loading step
+        self.loading_timer = QTimer(self)
+        self.loading_timer.timeout.connect(
+            lambda: self.update_loading_label("Printing")
+        )
+        self.loading_timer.start(500)  # Update the label every 500ms
+
+        # Step 2: Fetch and print every pallet in a single background task
+        self.label_updater = LabelUpdater(
+            self.run_batch_print_task, args=(tracking_numbers,)
+        )
+
+        # Connect the signals
+        self.label_updater.update_done.connect(self.handle_batch_print_done)
+        self.label_updater.update_failed.connect(self.handle_failed_print)
+
+        # Start the worker thread
+        self.label_updater.start()
+
+    def run_batch_print_task(self, tracking_numbers):
+        """
+        This function will be run in the background. It fetches every pallet in bulk
+        and prints them as one job. Returns the tracking numbers that were not found.
+        """
+        from pallet_form import generate_and_print_batch_pdf
+
+        if not self.check_db_connection():
+            raise ConnectionError("Disconnected from Database")
+
+        pallets = self.db.get_checklist_data(tracking_numbers)
+        if pallets:
+            generate_and_print_batch_pdf(
+                [
+                    (return_id_number, tracking_number, results)
+                    for tracking_number, (return_id_number, results) in pallets.items()
+                ]
+            )
+        return [tn for tn in tracking_numbers if tn not in pallets]
+
+    def handle_batch_print_done(self, not_found):
+        self.stop_loading_animation()
+        if not_found:
+            self.check_in_label.set_message(
+                f"Not found: {', '.join(not_found)}", "error"
+            )
+        else:
+            self.check_in_label.set_message("Printed Successfully", "ok")
+
     def handle_successful_print(self):
         self.stop_loading_animation()
         self.check_in_label.setText("Printed Successfully")
 
     def handle_failed_print(self):
         self.stop_loading_animation()
-        self.check_in_label.setText("Error Printing")
+        self.check_in_label.set_message("Error Printing", "error")
+
+    def print_bin_labels(self, tracking_number, results):
+        """Print the bin labels of the checked in SKUs in the background."""
+        if not LABEL_PRINTER["enabled"] or not results:
+            return
+        from zpl_labels import create_label_sink, print_labels
+
+        job = LabelUpdater(
+            print_labels,
+            args=(create_label_sink(LABEL_PRINTER), tracking_number, list(results)),
+        )
+        job.update_failed.connect(self.handle_failed_label_print)
+        job.finished.connect(lambda: self.label_print_jobs.remove(job))
+
+        # Keep a reference so the thread is not destroyed while running
+        self.label_print_jobs.append(job)
+        job.start()
+
+    def handle_failed_label_print(self, error_message):
+        self.check_in_label.set_message(
+            f"Error printing labels: {error_message}", "error"
+        )
 
     def on_sku_clicked(self, index):
+        self.edit_buffer.flush()
         self.check_in_label.setText(" ")
         if self.ready_to_click_next():
             self.mark_selected_sku(index)
-            self.reset_fields(clear_tracking=False)
             self.current_search_results = self.results[index]
             self.current_result_index = index
             self.show_results()
 
     def mark_selected_sku(self, index):
-        # If there was a previously selected index, reset its appearance
         if self.results:
-            selected_sku = self.results[index][0]
-            previous_sku = self.results[self.current_result_index][0]
-
-            selected_label = self.sku_selected_labels.get(selected_sku)
-            previous_label = self.sku_selected_labels.get(previous_sku)
-
-            if selected_label != previous_label:
-                selected_label.setStyleSheet(
-                    "border: 1px solid black; background-color: white;"
-                )
-                previous_label.setStyleSheet(
-                    "border: 0px; background-color: ligh gray;"
-                )
-            else:
-                selected_label.setStyleSheet(
-                    "border: 1px solid black; background-color: white;;"
-                )
+            self.pallet_model.select(index)
+            model_index = self.pallet_model.index_of(index)
+            if model_index.isValid():
+                self.pallet_view.scrollTo(model_index)
 
     def ready_to_click_next(self):
-        (
-            sku,
-            return_id_number,
-            expected_sku_amount,
-            sku_amount_received,
-            status,
-            note,
-            received,
-            wrong_parts,
-            components,
-        ) = self.results[self.current_result_index]
+        line = self.results[self.current_result_index]
+        status = line.status
 
         if status != "Select Status":
-            # Making sure the status has been selected
-            conditions = [condition for sku, condition in components.items()]
-
-            # Making sure the SKU is not empty if the status is "Wrong Part"
-            if status == "Wrong Part" and not sku:
-                self.check_in_label.setStyleSheet("color: red")
-                self.check_in_label.setText("Please enter a SKU.")
-                return False
-            # Making sure the SKU has been verified if the status is "Wrong Part"
-            elif status == "Wrong Part" and self.sku_layout_is_not_visible():
-                self.check_in_label.setStyleSheet("color: red")
-                self.check_in_label.setText("Please click search to verify SKU.")
-                return False
-            # Making sure if status is incomplete, there are no missing parts
-            elif status == "Incomplete" and "Missing" not in conditions:
-                self.check_in_label.setStyleSheet("color: red")
-                self.check_in_label.setText(
-                    "Can't be Incomplete. There are no missing parts."
-                )
-                return False
-            elif status == "Complete" and "Missing" in conditions:
-                self.check_in_label.setStyleSheet("color: red")
-                self.check_in_label.setText(
-                    "Can't be Complete. There are missing parts."
-                )
+            error = check_in_error(line, not self.sku_layout_is_not_visible())
+            if error:
+                self.check_in_label.set_message(error, "error")
                 return False
 
-            self.update_status_label_to_green(sku)
+            self.update_status_label_to_green(self.current_result_index)
 
         elif status == "Select Status":
-            self.update_status_label_to_red(sku)
+            self.update_status_label_to_red(self.current_result_index)
 
         return True
 
-    def update_status_label_to_green(self, sku):
-        self.sku_status_labels[sku].setStyleSheet("color: green;")
+    def update_status_label_to_green(self, row):
+        if self.pallet_session:
+            self.pallet_model.set_ready(row, True)
+            self.update_pallet_progress()
+            self.refresh_status_filter()
 
-    def update_status_label_to_red(self, sku):
-        self.sku_status_labels[sku].setStyleSheet("color: red;")
+    def update_status_label_to_red(self, row):
+        if self.pallet_session:
+            self.pallet_model.set_ready(row, False)
+            self.update_pallet_progress()
+            self.refresh_status_filter()
 
-    def clear_layout(self, layout):
-        if layout is not None:
-            while layout.count():
-                child = layout.takeAt(0)
-                if child.widget() is not None:
-                    child.widget().setParent(None)
-                elif child.layout() is not None:
-                    self.clear_layout(child.layout())
+    def pallet_filter_status(self):
+        status = self.pallet_status_filter.currentText()
+        return None if status == "All" else status
 
-    def clear_pallet_list(self):
-        # Clear any existing items in the pallet layout
-        for i in reversed(range(self.pallet_layout.count())):
-            item = self.pallet_layout.itemAt(i)
-            if item is not None:
-                widget_to_remove = item.widget()
-                if widget_to_remove is not None:
-                    widget_to_remove.setParent(None)
-                else:
-                    # If the item is a layout, recursively delete its items
-                    self.clear_layout(item.layout())
-                    self.pallet_layout.removeItem(item)
+    def apply_pallet_filter(self):
+        if not self.pallet_session:
+            return
+        text = self.pallet_filter_field.text()
+        status = self.pallet_filter_status()
+        if not text.strip() and status is None:
+            self.pallet_model.set_filter(None)
+        else:
+            self.pallet_model.set_filter(self.pallet_session.filter_rows(text, status))
+        self.mark_selected_sku(self.current_result_index)
 
-        # Make the pallet scroll area invisible
-        self.pallet_scroll_area.setVisible(False)
+    def refresh_status_filter(self):
+        # Statuses and ready states only change rows of a status filter
+        if self.pallet_filter_status() is not None:
+            self.apply_pallet_filter()
 
-    def populate_pallet_list(self, results):
-        skus = [sku for sku, _, _, _, _, _, _, _, _ in results]
-        sku_and_received = {
-            sku: received for sku, _, _, _, _, _, received, _, _ in results
-        }
-        # Clear any existing items in the pallet layout
-        self.pallet_scroll_area.setVisible(True)
-
-        for i in reversed(range(self.pallet_layout.count())):
-            widget_to_remove = self.pallet_layout.itemAt(i).widget()
-            if widget_to_remove is not None:
-                widget_to_remove.setParent(None)
-
-        self.sku_status_labels.clear()  # Clear the status labels dictionary
-        self.sku_selected_labels.clear()  # Clear the selected labels dictionary
-
-        # Populate the pallet layout with SKUs
-        for index, sku in enumerate(skus):
-            # Create a horizontal layout for each SKU
-            h_layout = QHBoxLayout()
-
-            # SKU Label with index
-            sku_label = ClickableLabel(index)
-            sku_label.setText(self.sku_cleanner(sku))
-            sku_label.setAlignment(Qt.AlignLeft)
-            sku_label.setAlignment(Qt.AlignVCenter)
-            sku_label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-            sku_label.clicked.connect(self.on_sku_clicked)  # Connect signal
-            h_layout.addWidget(sku_label)
-
-            # Status Label
-            status_label = QLabel("█")
-            status_label.setAlignment(Qt.AlignRight)
-            status_label.setAlignment(Qt.AlignVCenter)
-            if sku_and_received[sku]:
-                status_label.setStyleSheet("color: green;")
-            else:
-                status_label.setStyleSheet("color: red;")
-            status_label.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
-            h_layout.addWidget(status_label)
+    def jump_to_filtered_sku(self):
+        """Open the scanned SKU, or the only row left by the filter."""
+        if not self.pallet_session:
+            return
+        text = self.pallet_filter_field.text().strip()
+        row = self.pallet_session.row_of(text)
+        if row is None:
+            row = self.pallet_session.row_of(text.upper())
+        if row is None and self.pallet_model.rowCount() == 1:
+            row = self.pallet_model.session_row(0)
+        if row is None:
+            self.check_in_label.set_message(f"{text} is not in this pallet.", "error")
+            return
 
-            # Add the horizontal layout to the pallet layout
-            self.pallet_layout.addLayout(h_layout)
+        self.pallet_filter_field.clear()
+        self.on_sku_clicked(row)
 
-            # Store the status label for later updates
-            self.sku_status_labels[sku] = status_label
-            self.sku_selected_labels[sku] = sku_label
+    def update_pallet_progress(self):
+        session = self.pallet_session
+        self.pallet_progress_label.setText(
+            f"{session.ready_count} of {len(session)} SKUs ready, "
+            f"{session.received_count} received"
+        )
 
-    # UI manipulators -------------------------------------------------------------------
-    def sku_cleanner(self, sku):
-        sku_and_po = sku.split("@")
-        return sku_and_po[0]
+    def clear_pallet_list(self):
+        self.stop_pallet_polling()
+        self.pallet_session = None
+        self.pallet_model.clear()
+        self.reset_pallet_filter()
+        self.pallet_panel.setVisible(False)
+
+    def reset_pallet_filter(self):
+        for widget in (self.pallet_filter_field, self.pallet_status_filter):
+            widget.blockSignals(True)
+        self.pallet_filter_field.clear()
+        self.pallet_status_filter.setCurrentIndex(0)
+        for widget in (self.pallet_filter_field, self.pallet_status_filter):
+            widget.blockSignals(False)
+
+    def populate_pallet_list(self, results):
+        self.pallet_session = PalletSession(results)
+        self.pallet_model.set_session(self.pallet_session)
+        self.reset_pallet_filter()
+        self.update_pallet_progress()
+        self.pallet_view.scrollToTop()
+        self.pallet_panel.setVisible(True)
 
+    # UI manipulators -------------------------------------------------------------------
     def clear_button_click(self):
         self.reset_fields(True)
 
     def show_results(self):
-        if self.results[self.current_result_index]:
-            (
-                sku,
-                return_id_number,
-                expected_sku_amount,
-                sku_amount_received,
-                status,
-                note,
-                received,
-                wrong_parts,
-                components,
-            ) = self.results[self.current_result_index]
-            if status == "Wrong Part":
-                sku = ""
-            self.status_dropdown.setCurrentText(status)
-            self.sku_field.setText(self.sku_cleanner(sku))
-            self.auth_value.setText(return_id_number)
-            self.expected_value.setText(str(expected_sku_amount))
-            self.received_value.setText(
-                f"{sku_amount_received} out of {expected_sku_amount}"
+        """
+        Brings the form in line with the current return line. Only the widgets
+        showing a different value are updated, and their signals are blocked so
+        the updates don't re-fire the change handlers.
+        """
+        line = self.results[self.current_result_index]
+        if line:
+            wrong_part = line.status == "Wrong Part"
+
+            update_widget(
+                self.status_dropdown, line.status, "currentText", "setCurrentText"
+            )
+            update_widget(
+                self.sku_field, line.wrong_sku if wrong_part else line.clean_sku
             )
-            self.note_field.setText(note)
+            if self.sku_field.isEnabled() != wrong_part:
+                self.sku_field.setEnabled(wrong_part)
+            if self.search_sku_button.isVisible() != wrong_part:
+                self.search_sku_button.setVisible(wrong_part)
+
+            update_widget(self.auth_value, line.return_id_number)
+            if self.pallet_session:
+                # Kept up to date as the SKUs of the pallet are checked in
+                expected, received = self.pallet_session.sku_amounts_of(
+                    self.current_result_index
+                )
+            else:
+                expected, received = line.expected_sku_amount, line.sku_amount_received
+            update_widget(self.expected_value, str(expected))
+            update_widget(self.received_value, f"{received} out of {expected}")
+            update_widget(self.note_field, line.note, "toPlainText", "setPlainText")
 
-            if components:
-                self.update_sku_status_layout(components)
+            # The model only repaints the conditions that changed
+            self.update_sku_status_layout(line.parts)
 
-            if received:
-                self.check_in_label.setStyleSheet("color: green")
-                self.check_in_label.setText("Tracking Number already checked in.")
+            if line.received:
+                self.check_in_label.set_message(
+                    "Tracking Number already checked in.", "ok"
+                )
                 self.current_tracking_number_was_checked_in = True
 
     def reset_fields(self, clear_tracking=True):
         # Resetting Tracking Number field
         if clear_tracking:
+            self.edit_buffer.discard()
             self.tracking_number_field.clear()
             self.tracking_number_field.setDisabled(False)
             self.status_dropdown.setCurrentIndex(0)
@@ -1070,6 +1921,8 @@ class MainWindow(QMainWindow):
             self.results = None
             self.pallet_note_button.setVisible(False)
             self.current_pallet_note = None
+            self.loaded_pallet_note = None
+            self.pallet_note_version = None
 
         # Resetting Information fields
         self.auth_value.setText(" ")
@@ -1086,57 +1939,16 @@ class MainWindow(QMainWindow):
         self.tracking_number_field.setFocus()
 
     def update_sku_status_layout(self, components):
-        self.do_not_update_state = True
-        # Hide all SKU widgets initially
-        for layout, label, dropdown in self.sku_widgets:
-            label.setVisible(False)
-            dropdown.setVisible(False)
-
-        # Get the list of SKUs from the components
-        sku_list = list(components.keys())
-
-        # Update and show only the widgets you need based on sku_list
-        for i, sku in enumerate(sku_list):
-            if i < len(self.sku_widgets):
-
-                layout, label, dropdown = self.sku_widgets[i]
-                contition = components[sku]
-                if contition == "Good":
-                    dropdown.setCurrentIndex(0)
-                elif contition == "Damaged":
-                    dropdown.setCurrentIndex(1)
-                elif contition == "Missing":
-                    dropdown.setCurrentIndex(2)
-                else:
-                    dropdown.setCurrentIndex(0)
-                label.setText(sku)  # Update SKU label
-                label.setVisible(True)  # Show the label
-                dropdown.setVisible(True)  # Show the dropdown
-
-        self.do_not_update_state = False
+        self.component_model.set_components(components)
 
     def get_sku_status_layout(self):
-        components = {}
-        for layout, label, dropdown in self.sku_widgets:
-            sku = label.text()
-            if sku == "SKU":
-                continue
-            status = dropdown.currentText()
-            if sku and status:
-                components[sku] = status
-        return components
+        return self.component_model.components()
 
     def clear_sku_status_layout(self):
-        # Hide all SKU widgets
-        for layout, label, dropdown in self.sku_widgets:
-            label.setText("SKU")
-            label.setVisible(False)
-            dropdown.setVisible(False)
+        self.component_model.clear()
 
     def sku_layout_is_not_visible(self):
-        return not any(
-            label.isVisible() for layout, label, dropdown in self.sku_widgets
-        )
+        return self.component_model.rowCount() == 0
 
     # Copying the authorization ID --------------------------------------------------------
 
@@ -1167,18 +1979,19 @@ class MainWindow(QMainWindow):
 
     # Database connection -------------------------------------------------------------------
 
+    def report_database_unavailable(self, error):
+        self.check_in_label.set_message(str(error), "error")
+        self.db_label.set_message("Disconnected from Database", "error")
+
     def check_db_connection(self):
         if self.db.check_if_connected():
-            self.db_label.setText("Connected to Database")
-            self.db_label.setStyleSheet("color: green")
+            self.db_label.set_message("Connected to Database", "ok")
             return True
         else:
             try:
                 self.db.reconnect()
-                self.db_label.setText("Connected to Database")
-                self.db_label.setStyleSheet("color: green")
+                self.db_label.set_message("Connected to Database", "ok")
                 return True
             except Exception as e:
-                self.db_label.setText("Disconnected from Database")
-                self.db_label.setStyleSheet("color: red")
+                self.db_label.set_message("Disconnected from Database", "error")
                 return False
@@ -0,0 +1,115 @@
+import re
+import socket
+
+# Sizes are in dots for a 2" x 1" label on a 203 dpi printer
+SKU_LABEL_TEMPLATE = (
+    "^XA^CI28^PW406^LL203"
+    "^FO20,12^A0N,34,34^FH^FD{sku}^FS"
+    "^FO20,52^BY2^BCN,60,N,N,N^FH^FD{sku}^FS"
+    "^FO20,126^A0N,24,24^FH^FDRMA: {return_id_number}^FS"
+    "^FO20,158^A0N,24,24^FH^FD{tracking_number}^FS"
+    "^XZ"
+)
+
+COMPONENT_LABEL_TEMPLATE = (
+    "^XA^CI28^PW406^LL203"
+    "^FO20,12^A0N,30,30^FH^FD{component}^FS"
+    "^FO20,48^BY2^BCN,60,N,N,N^FH^FD{component}^FS"
+    "^FO20,122^A0N,24,24^FH^FDSKU: {sku}^FS"
+    "^FO20,154^A0N,24,24^FH^FD{condition} - RMA: {return_id_number}^FS"
+    "^XZ"
+)
+
+# ^FH makes the printer read "_XX" as a hex escaped character, so the ZPL control
+# characters and the escape character itself can be printed safely
+ZPL_ESCAPES = str.maketrans({"_": "_5F", "^": "_5E", "~": "_7E"})
+
+
+class LabelTemplate:
+    """A ZPL template compiled once into its literal chunks and field names."""
+
+    FIELD_PATTERN = re.compile(r"\{(\w+)\}")
+
+    def __init__(self, template):
+        parts = self.FIELD_PATTERN.split(template)
+        self.first_literal = parts[0]
+        self.fields = list(zip(parts[1::2], parts[2::2]))
+
+    def render(self, values):
+        """Fill the template with the escaped values of its fields."""
+        chunks = [self.first_literal]
+        for field, literal in self.fields:
+            chunks.append(str(values[field]).translate(ZPL_ESCAPES))
+            chunks.append(literal)
+        return "".join(chunks)
+
+
+SKU_LABEL = LabelTemplate(SKU_LABEL_TEMPLATE)
+COMPONENT_LABEL = LabelTemplate(COMPONENT_LABEL_TEMPLATE)
+
+
+def generate_labels(tracking_number, results):
+    """
+    Yield the ZPL of a label for every SKU and received component of a return or
+    pallet. Missing components get no label, there is nothing to put in the bin.
+    :param results: The return lines that were checked in.
+    """
+    for result in results:
+        values = {
+            "sku": result.clean_sku,
+            "return_id_number": result.return_id_number,
+            "tracking_number": tracking_number,
+        }
+        yield SKU_LABEL.render(values)
+
+        for component, condition in result.parts.items():
+            if condition == "Missing":
+                continue
+            values["component"] = component
+            values["condition"] = condition or "Good"
+            yield COMPONENT_LABEL.render(values)
+
+
+def render_labels(tracking_number, results):
+    """Render every label of a return or pallet into a single ZPL job."""
+    return "".join(generate_labels(tracking_number, results))
+
+
+class FileLabelSink:
+    """Appends ZPL jobs to a file. Stand-in for the label printer when testing."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, zpl):
+        with open(self.path, "a", encoding="utf-8") as label_file:
+            label_file.write(zpl)
+
+
+class NetworkLabelSink:
+    """Sends raw ZPL jobs to a networked label printer."""
+
+    def __init__(self, host, port=9100, timeout=5):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def send(self, zpl):
+        with socket.create_connection((self.host, self.port), self.timeout) as conn:
+            conn.sendall(zpl.encode("utf-8"))
+
+
+def create_label_sink(printer_config):
+    """Create the sink described by the label printer configuration."""
+    if printer_config.get("file"):
+        return FileLabelSink(printer_config["file"])
+    return NetworkLabelSink(
+        printer_config["host"],
+        printer_config.get("port", 9100),
+        printer_config.get("timeout", 5),
+    )
+
+
+def print_labels(sink, tracking_number, results):
+    """Render the labels of a return or pallet and send them as one job."""
+    sink.send(render_labels(tracking_number, results))